@@ -46,12 +46,15 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'name',
         'author',
+        'count_favorites',
     )
     list_filter = ('name', 'author', 'tags')
     empty_value_display = '-пусто-'
 
     def count_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
+    count_favorites.short_description = 'В избранном'
+    count_favorites.admin_order_field = 'favorites_count'
 
 
 admin.site.register(Ingredient, IngredientAdmin)
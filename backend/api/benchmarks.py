@@ -0,0 +1,665 @@
+import csv
+import io
+import json
+import os
+import random
+import statistics
+import time
+import tracemalloc
+from base64 import b64encode
+from itertools import combinations
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api.caching import cache_stats
+from api.counters import reconcile_counters
+from api.feed import rebuild_feeds
+from api.images import image_options, process_image
+from api.models import (
+    CountOfIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartIngredient,
+    Tag
+)
+from api.parsers import FastJSONParser
+from api.ranking import create_ranks
+from api.renderers import FastJSONRenderer
+from api.representations import build_recipe_fragments
+from api.serializers import RecipeReadSerializer, serialize_fragments
+from api.shopping_cart import expected_shopping_cart_totals
+from users.models import Follow, User
+
+BENCHMARK_PREFIX = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark-password'
+BENCHMARK_IMAGE = 'benchmark.png'
+INGREDIENTS_CSV = os.path.join(
+    os.path.dirname(settings.BASE_DIR), 'data', 'ingredients.csv'
+)
+TAG_COLORS = ('#E26C2D', '#49B64E', '#8775D2', '#F2C94C', '#56CCF2')
+RECIPE_FILTERS = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+INGREDIENT_QUERIES = ('а', 'мол', 'сливоч', 'ое мас')
+IMAGE_SIZES = ((1024, 768), (3000, 2000))
+JSON_PAYLOAD_RECIPES = 100
+JSON_RENDERERS = (JSONRenderer, FastJSONRenderer)
+JSON_PARSERS = (JSONParser, FastJSONParser)
+REPRESENTATION_BUILDERS = (
+    ('serializer', serialize_fragments),
+    ('fast', build_recipe_fragments),
+)
+REPRESENTATION_RENDITIONS = (None, 'thumbnail')
+
+
+def bulk_create(model, objects):
+    return model.objects.bulk_create(objects)
+
+
+def ensure_ingredients(count, rng):
+    existing = Ingredient.objects.count()
+    if existing >= count:
+        return list(Ingredient.objects.values_list('pk', flat=True))
+    names = set(Ingredient.objects.values_list('name', flat=True))
+    new = []
+    if os.path.exists(INGREDIENTS_CSV):
+        with open(INGREDIENTS_CSV, encoding='utf-8') as file:
+            for name, measurement_unit in csv.reader(file):
+                if name not in names:
+                    names.add(name)
+                    new.append(Ingredient(
+                        name=name, measurement_unit=measurement_unit
+                    ))
+    number = 0
+    while existing + len(new) < count:
+        name = f'{BENCHMARK_PREFIX} ингредиент {number}'
+        number += 1
+        if name not in names:
+            new.append(Ingredient(
+                name=name, measurement_unit=rng.choice(('г', 'мл', 'шт'))
+            ))
+    bulk_create(Ingredient, new[:max(count - existing, 0)])
+    return list(Ingredient.objects.values_list('pk', flat=True))
+
+
+def ensure_tags(count):
+    existing = set(Tag.objects.values_list('slug', flat=True))
+    bulk_create(Tag, [
+        Tag(
+            name=f'Тег {number}',
+            color=TAG_COLORS[number % len(TAG_COLORS)],
+            slug=f'{BENCHMARK_PREFIX}-{number}',
+        )
+        for number in range(count)
+        if f'{BENCHMARK_PREFIX}-{number}' not in existing
+    ])
+    return list(Tag.objects.filter(
+        slug__startswith=BENCHMARK_PREFIX
+    ).values_list('pk', flat=True))
+
+
+def clear_benchmark_data():
+    with transaction.atomic():
+        Recipe.objects.filter(
+            author__username__startswith=BENCHMARK_PREFIX
+        ).delete()
+        User.objects.filter(username__startswith=BENCHMARK_PREFIX).delete()
+        Tag.objects.filter(slug__startswith=BENCHMARK_PREFIX).delete()
+        Ingredient.objects.filter(
+            name__startswith=BENCHMARK_PREFIX
+        ).delete()
+
+
+def seed(users, recipes, ingredients=2000, tags=5,
+         ingredients_per_recipe=(3, 15), tags_per_recipe=(1, 3),
+         favorites_per_user=20, carts_per_user=5, follows_per_user=10,
+         heavy_cart=500, random_seed=0):
+    """
+    Создает пользователей, рецепты с ингредиентами и тегами,
+    избранное, списки покупок и подписки
+    Первый пользователь получает список покупок из heavy_cart рецептов
+    Данные вставляются через bulk_create без сигналов, поэтому счетчики
+    и ленты подписок после вставки пересчитываются
+    Возвращает словарь с количеством созданных объектов
+    """
+    rng = random.Random(random_seed)
+    ingredient_ids = ensure_ingredients(ingredients, rng)
+    tag_ids = ensure_tags(tags)
+    password = make_password(BENCHMARK_PASSWORD)
+    start = User.objects.filter(
+        username__startswith=BENCHMARK_PREFIX
+    ).count()
+    with transaction.atomic():
+        new_users = bulk_create(User, [
+            User(
+                username=f'{BENCHMARK_PREFIX}{number}',
+                email=f'{BENCHMARK_PREFIX}{number}@example.com',
+                first_name='Тест',
+                last_name=f'Пользователь {number}',
+                password=password,
+            )
+            for number in range(start, start + users)
+        ])
+        user_ids = list(User.objects.filter(
+            username__in=[user.username for user in new_users]
+        ).values_list('pk', flat=True))
+        bulk_create(Recipe, [
+            Recipe(
+                name=f'Рецепт {number}',
+                text='Описание рецепта ' * rng.randint(5, 50),
+                cooking_time=rng.randint(5, 180),
+                author_id=rng.choice(user_ids),
+                image=BENCHMARK_IMAGE,
+            )
+            for number in range(recipes)
+        ])
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).values_list('pk', flat=True))
+        create_ranks(recipe_ids)
+        seed_recipe_relations(
+            rng, recipe_ids, ingredient_ids, tag_ids,
+            ingredients_per_recipe, tags_per_recipe,
+        )
+        seed_user_relations(
+            rng, user_ids, recipe_ids,
+            favorites_per_user, carts_per_user, follows_per_user,
+            heavy_cart,
+        )
+        totals = expected_shopping_cart_totals(user_ids)
+        bulk_create(ShoppingCartIngredient, [
+            ShoppingCartIngredient(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount,
+            )
+            for (user_id, ingredient_id), total_amount in totals.items()
+        ])
+        reconcile_counters(fix=True)
+        rebuild_feeds()
+    return {
+        'users': len(user_ids),
+        'recipes': len(recipe_ids),
+        'ingredients': len(ingredient_ids),
+        'tags': len(tag_ids),
+    }
+
+
+def seed_recipe_relations(rng, recipe_ids, ingredient_ids, tag_ids,
+                          ingredients_per_recipe, tags_per_recipe):
+    amounts = []
+    recipe_tags = []
+    for recipe_id in recipe_ids:
+        for ingredient_id in rng.sample(
+            ingredient_ids,
+            min(rng.randint(*ingredients_per_recipe), len(ingredient_ids))
+        ):
+            amounts.append(CountOfIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            ))
+        for tag_id in rng.sample(
+            tag_ids, min(rng.randint(*tags_per_recipe), len(tag_ids))
+        ):
+            recipe_tags.append(Recipe.tags.through(
+                recipe_id=recipe_id, tag_id=tag_id
+            ))
+    bulk_create(CountOfIngredient, amounts)
+    bulk_create(Recipe.tags.through, recipe_tags)
+
+
+def seed_user_relations(rng, user_ids, recipe_ids, favorites_per_user,
+                        carts_per_user, follows_per_user, heavy_cart):
+    favorites = []
+    carts = []
+    follows = []
+    for number, user_id in enumerate(user_ids):
+        for recipe_id in rng.sample(
+            recipe_ids, min(favorites_per_user, len(recipe_ids))
+        ):
+            favorites.append(Favorite(user_id=user_id, recipe_id=recipe_id))
+        cart_size = heavy_cart if number == 0 else carts_per_user
+        for recipe_id in rng.sample(
+            recipe_ids, min(cart_size, len(recipe_ids))
+        ):
+            carts.append(ShoppingCart(user_id=user_id, recipe_id=recipe_id))
+        authors = [author for author in user_ids if author != user_id]
+        for author_id in rng.sample(
+            authors, min(follows_per_user, len(authors))
+        ):
+            follows.append(Follow(user_id=user_id, author_id=author_id))
+    bulk_create(Favorite, favorites)
+    bulk_create(ShoppingCart, carts)
+    bulk_create(Follow, follows)
+
+
+def recipe_scenarios(user):
+    """Все комбинации фильтров RecipeFilter"""
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    values = {
+        'tags': [('tags', slug) for slug in tags],
+        'author': [('author', user.pk)],
+        'is_favorited': [('is_favorited', 1)],
+        'is_in_shopping_cart': [('is_in_shopping_cart', 1)],
+    }
+    for size in range(len(RECIPE_FILTERS) + 1):
+        for names in combinations(RECIPE_FILTERS, size):
+            params = [('limit', 6)]
+            for name in names:
+                params.extend(values[name])
+            label = '+'.join(names) or 'no filters'
+            yield f'recipes [{label}]', f'/api/recipes/?{urlencode(params)}'
+
+
+def deep_page_scenarios():
+    count = Recipe.objects.count()
+    last_page = max((count + 5) // 6, 1)
+    yield 'recipes page 1', '/api/recipes/?limit=6&page=1'
+    yield 'recipes last page', f'/api/recipes/?limit=6&page={last_page}'
+    oldest = Recipe.objects.order_by('pk').values_list('pk', flat=True)[6:7]
+    yield (
+        'recipes cursor first page',
+        '/api/recipes/?limit=6&pagination=cursor',
+    )
+    if oldest:
+        cursor = b64encode(f'p={oldest[0]}'.encode()).decode()
+        yield 'recipes cursor last page', (
+            f'/api/recipes/?{urlencode({"limit": 6, "cursor": cursor})}'
+        )
+
+
+def scenarios(user):
+    yield from recipe_scenarios(user)
+    yield from deep_page_scenarios()
+    recipe = Recipe.objects.order_by('-pk').first()
+    if recipe is not None:
+        yield 'recipe detail', f'/api/recipes/{recipe.pk}/'
+    yield 'tags', '/api/tags/'
+    yield 'ingredients', '/api/ingredients/'
+    for value in INGREDIENT_QUERIES:
+        yield (
+            f'ingredients [name={value}]',
+            f'/api/ingredients/?{urlencode({"name": value})}',
+        )
+    yield 'subscriptions', '/api/users/subscriptions/?recipes_limit=3'
+    for file_format in ('txt', 'csv', 'json'):
+        yield (
+            f'download_shopping_cart [{file_format}]',
+            f'/api/recipes/download_shopping_cart/?format={file_format}',
+        )
+
+
+def conditional_scenarios(client):
+    """
+    Повторные запросы списка и рецепта с ETag предыдущего ответа:
+    ответ 304 без сериализации
+    """
+    recipe = Recipe.objects.order_by('-pk').first()
+    urls = [('recipes page 1', '/api/recipes/?limit=6&page=1')]
+    if recipe is not None:
+        urls.append(('recipe detail', f'/api/recipes/{recipe.pk}/'))
+    for name, url in urls:
+        etag = client.get(url).get('ETag')
+        if etag:
+            yield (
+                f'{name} [If-None-Match]', url, {'HTTP_IF_NONE_MATCH': etag}
+            )
+
+
+def all_scenarios(client, user):
+    for name, url in scenarios(user):
+        yield name, url, {}
+    yield from conditional_scenarios(client)
+
+
+def request(client, url, headers=None):
+    response = client.get(url, **(headers or {}))
+    if getattr(response, 'streaming', False):
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    return response.status_code, size
+
+
+def cache_counters():
+    """Попадания и промахи кэша текущего процесса по всем пространствам"""
+    hits = misses = 0
+    for counters in cache_stats.snapshot().values():
+        hits += counters['hits']
+        misses += counters['misses']
+    return hits, misses
+
+
+def measure(client, url, iterations, warmup, allocations, headers=None):
+    for _ in range(warmup):
+        request(client, url, headers)
+    hits, misses = cache_counters()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        status, size = request(client, url, headers)
+        timings.append((time.perf_counter() - started) * 1000)
+    new_hits, new_misses = cache_counters()
+    with CaptureQueriesContext(connection) as queries:
+        request(client, url, headers)
+    result = {
+        'url': url,
+        'status': status,
+        'bytes': size,
+        'queries': len(queries.captured_queries),
+        'cache_hits': new_hits - hits,
+        'cache_misses': new_misses - misses,
+        **timings_summary(timings),
+    }
+    if allocations:
+        tracemalloc.start()
+        request(client, url, headers)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_alloc_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def timings_summary(timings):
+    return {
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(
+            sorted(timings)[max(int(len(timings) * 0.95) - 1, 0)], 3
+        ),
+        'min_ms': round(min(timings), 3),
+    }
+
+
+def source_image(size):
+    """PNG с градиентом: плохо сжимается, как фотография"""
+    image = Image.radial_gradient('L').resize(size).convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def image_scenarios():
+    for width, height in IMAGE_SIZES:
+        yield f'image: process {width}x{height} png', (width, height)
+
+
+def measure_image(size, iterations, warmup):
+    """Время декодирования и кодирования всех размеров изображения"""
+    content = source_image(size)
+    options = image_options()
+    for _ in range(warmup):
+        process_image(content, options)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        renditions, extension = process_image(content, options)
+        timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'source_bytes': len(content),
+        'format': extension,
+        'bytes': {
+            field: len(data) for field, data in renditions.items()
+        },
+        'queries': 0,
+        **timings_summary(timings),
+    }
+
+
+def delete_recipes(recipe_ids):
+    for recipe in Recipe.objects.filter(pk__in=recipe_ids):
+        for field in settings.RECIPE_IMAGE_RENDITIONS:
+            getattr(recipe, field).delete(save=False)
+    Recipe.objects.filter(pk__in=recipe_ids).delete()
+
+
+def measure_upload(client, iterations, warmup):
+    """
+    Время ответа на создание рецепта с большим изображением:
+    обработка изображения не должна задерживать ответ
+    """
+    size = IMAGE_SIZES[-1]
+    payload = {
+        'ingredients': [{
+            'id': Ingredient.objects.values_list('pk', flat=True).first(),
+            'amount': 10,
+        }],
+        'tags': list(Tag.objects.values_list('pk', flat=True)[:1]),
+        'image': (
+            'data:image/png;base64,'
+            + b64encode(source_image(size)).decode()
+        ),
+        'name': f'{BENCHMARK_PREFIX} upload',
+        'text': f'{BENCHMARK_PREFIX} upload',
+        'cooking_time': 10,
+    }
+    recipe_ids = []
+
+    def upload():
+        response = client.post('/api/recipes/', payload, format='json')
+        recipe_ids.append(response.data.get('id'))
+        return response
+
+    try:
+        for _ in range(warmup):
+            upload()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = upload()
+            timings.append((time.perf_counter() - started) * 1000)
+        with CaptureQueriesContext(connection) as queries:
+            upload()
+    finally:
+        delete_recipes(recipe_ids)
+    return {
+        'url': '/api/recipes/',
+        'status': response.status_code,
+        'source_bytes': len(payload['image']),
+        'workers': settings.RECIPE_IMAGE_WORKERS,
+        'queries': len(queries.captured_queries),
+        **timings_summary(timings),
+    }
+
+
+def json_payload(user):
+    """Данные страницы из JSON_PAYLOAD_RECIPES рецептов"""
+    recipes = list(
+        Recipe.objects.with_user_flags(user)[:JSON_PAYLOAD_RECIPES]
+    )
+    return RecipeReadSerializer(recipes, many=True).data
+
+
+def json_scenarios():
+    for renderer_class in JSON_RENDERERS:
+        yield (
+            f'json: render {JSON_PAYLOAD_RECIPES} recipes '
+            f'[{renderer_class.__name__}]',
+            measure_render, renderer_class,
+        )
+    for parser_class in JSON_PARSERS:
+        yield (
+            f'json: parse {JSON_PAYLOAD_RECIPES} recipes '
+            f'[{parser_class.__name__}]',
+            measure_parse, parser_class,
+        )
+
+
+def measure_codec(call, iterations, warmup):
+    for _ in range(warmup):
+        call()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings_summary(timings)
+
+
+def measure_render(renderer_class, data, iterations, warmup):
+    """
+    Время рендеринга данных; same_output - совпадает ли результат
+    с результатом JSONRenderer после разбора
+    """
+    renderer = renderer_class()
+    content = renderer.render(data)
+    expected = json.loads(JSONRenderer().render(data))
+    return {
+        'bytes': len(content),
+        'same_output': json.loads(content) == expected,
+        'queries': 0,
+        **measure_codec(lambda: renderer.render(data), iterations, warmup),
+    }
+
+
+def measure_parse(parser_class, data, iterations, warmup):
+    parser = parser_class()
+    content = JSONRenderer().render(data)
+    context = {'encoding': 'utf-8'}
+
+    def parse():
+        return parser.parse(io.BytesIO(content), parser_context=context)
+
+    return {
+        'bytes': len(content),
+        'same_output': parse() == json.loads(content),
+        'queries': 0,
+        **measure_codec(parse, iterations, warmup),
+    }
+
+
+def representation_mismatches(recipes, rendition=None):
+    """
+    id рецептов, у которых фрагмент build_recipe_fragments
+    после рендеринга в JSON отличается от фрагмента
+    RecipeFragmentSerializer
+    """
+    render = FastJSONRenderer().render
+    expected = serialize_fragments(list(recipes), rendition)
+    fast = build_recipe_fragments(list(recipes), rendition)
+    return [
+        recipe.pk for recipe in recipes
+        if render(fast.get(recipe.pk)) != render(expected.get(recipe.pk))
+    ]
+
+
+def representation_scenarios():
+    for name, build in REPRESENTATION_BUILDERS:
+        yield (
+            f'representation: build {JSON_PAYLOAD_RECIPES} recipes [{name}]',
+            build,
+        )
+
+
+def measure_representation(build, iterations, warmup):
+    """
+    Время построения фрагментов страницы рецептов без кэша,
+    вместе с запросом страницы; same_output - совпадает ли результат
+    с RecipeFragmentSerializer для всех размеров изображения
+    """
+    recipes = Recipe.objects.order_by('-pk')[:JSON_PAYLOAD_RECIPES]
+
+    def call():
+        return build(list(recipes), 'thumbnail')
+
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    page = list(recipes)
+    return {
+        'recipes': len(page),
+        'same_output': not any(
+            representation_mismatches(page, rendition)
+            for rendition in REPRESENTATION_RENDITIONS
+        ),
+        'queries': len(queries.captured_queries),
+        **measure_codec(call, iterations, warmup),
+    }
+
+
+def benchmark_user():
+    """Пользователь с самым большим списком покупок"""
+    user = User.objects.filter(
+        username__startswith=BENCHMARK_PREFIX
+    ).order_by('pk').first()
+    return user or User.objects.order_by('pk').first()
+
+
+def run_serialization(user, iterations, warmup, only):
+    """Сценарии рендеринга JSON и построения представлений рецептов"""
+    results, payload = {}, None
+    for name, measure_json, codec in json_scenarios():
+        if only and not any(part in name for part in only):
+            continue
+        if payload is None:
+            payload = json_payload(user)
+        results[name] = measure_json(codec, payload, iterations, warmup)
+    for name, build in representation_scenarios():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure_representation(build, iterations, warmup)
+    return results
+
+
+def run(iterations=20, warmup=2, allocations=True, only=None):
+    """
+    Замеряет время ответа, количество запросов к базе данных
+    и пиковый объем выделенной памяти для каждого сценария
+    """
+    user = benchmark_user()
+    client = APIClient()
+    client.force_authenticate(user)
+    results = {}
+    for name, url, headers in all_scenarios(client, user):
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(
+            client, url, iterations, warmup, allocations, headers
+        )
+    for name, size in image_scenarios():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure_image(size, iterations, warmup)
+    results.update(run_serialization(user, iterations, warmup, only))
+    name = f'image: upload recipe {IMAGE_SIZES[-1][0]}x{IMAGE_SIZES[-1][1]}'
+    if not only or any(part in name for part in only):
+        results[name] = measure_upload(client, iterations, warmup)
+    cache_stats.flush()
+    return {
+        'database': connection.vendor,
+        'iterations': iterations,
+        'user': user.pk,
+        'dataset': {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'ingredients': Ingredient.objects.count(),
+            'favorites': Favorite.objects.count(),
+            'shopping_carts': ShoppingCart.objects.count(),
+            'follows': Follow.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, report, metrics=('p50_ms', 'queries')):
+    """Строки сравнения двух отчетов по общим сценариям"""
+    for name, result in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        changes = []
+        for metric in metrics:
+            old, new = previous.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            delta = (new - old) / old * 100 if old else 0
+            changes.append(f'{metric}: {old} -> {new} ({delta:+.1f}%)')
+        yield f'{name}: ' + ', '.join(changes)
@@ -0,0 +1,316 @@
+import hashlib
+import time
+from collections import Counter
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from api.renderers import FastJSONRenderer
+
+NAMESPACES = ('recipe', 'tag', 'ingredient')
+NAMESPACE_KEY = '{namespace}:{version}:{key}'
+NAMESPACE_VERSION_KEY = 'version:{namespace}'
+OBJECT_VERSION_KEY = 'version:{namespace}:{id}'
+STATS_KEY = 'stats:{namespace}:{event}'
+STATS_EVENTS = ('hits', 'misses')
+REPRESENTATION_KEY = 'representation'
+
+MISSING = object()
+
+
+class CacheStats:
+    """
+    Счетчики попаданий и промахов кэша по пространствам имен
+    Считаются в памяти процесса и не чаще раза
+    в CACHE_STATS_FLUSH_INTERVAL секунд добавляются к общим счетчикам
+    в кэше, чтобы учитывать все процессы
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.local = Counter()
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+
+    def record(self, namespace, hit):
+        key = (namespace, STATS_EVENTS[0] if hit else STATS_EVENTS[1])
+        with self._lock:
+            self.local[key] += 1
+            self.pending[key] += 1
+        interval = settings.CACHE_STATS_FLUSH_INTERVAL
+        if time.monotonic() - self.flushed_at >= interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        for (namespace, event), count in pending.items():
+            key = STATS_KEY.format(namespace=namespace, event=event)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                cache.set(key, count, None)
+
+    def keys(self):
+        return [
+            STATS_KEY.format(namespace=namespace, event=event)
+            for namespace in NAMESPACES for event in STATS_EVENTS
+        ]
+
+    def shared(self):
+        """Общие счетчики всех процессов: {namespace: {hits, misses}}"""
+        self.flush()
+        values = cache.get_many(self.keys())
+        return {
+            namespace: {
+                event: values.get(
+                    STATS_KEY.format(namespace=namespace, event=event), 0
+                )
+                for event in STATS_EVENTS
+            }
+            for namespace in NAMESPACES
+        }
+
+    def snapshot(self):
+        """Счетчики текущего процесса: {namespace: {hits, misses}}"""
+        with self._lock:
+            return {
+                namespace: {
+                    event: self.local[namespace, event]
+                    for event in STATS_EVENTS
+                }
+                for namespace in NAMESPACES
+            }
+
+    def reset(self):
+        with self._lock:
+            self.local.clear()
+            self.pending.clear()
+        cache.delete_many(self.keys())
+
+
+class NamespacedCache:
+    """
+    Общий кэш (CACHES['default']) с ключами по пространствам имен моделей
+    У каждого пространства есть версия в кэше, она входит в ключи;
+    инвалидация увеличивает версию, и старые ключи больше не читаются
+    Начальная версия - время в наносекундах, чтобы после вытеснения
+    версии из кэша старые ключи не стали снова актуальными
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def version_key(self, namespace):
+        return NAMESPACE_VERSION_KEY.format(namespace=namespace)
+
+    def version(self, namespace):
+        key = self.version_key(namespace)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        return version
+
+    def versions(self, namespaces=(), objects=None):
+        """
+        Версии пространств имен и отдельных объектов одним запросом к кэшу
+        objects -- словарь {пространство имен: id объектов}
+        Возвращает словарь {пространство имен или (пространство, id): версия}
+        """
+        keys = {
+            self.version_key(namespace): namespace
+            for namespace in namespaces
+        }
+        for namespace, ids in (objects or {}).items():
+            keys.update(
+                (OBJECT_VERSION_KEY.format(namespace=namespace, id=pk),
+                 (namespace, pk))
+                for pk in ids
+            )
+        found = cache.get_many(keys)
+        missing = {key: time.time_ns() for key in keys if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            found.update(missing)
+        return {name: found[key] for key, name in keys.items()}
+
+    def make_key(self, namespace, key, version=None):
+        return NAMESPACE_KEY.format(
+            namespace=namespace,
+            version=self.version(namespace) if version is None else version,
+            key=key,
+        )
+
+    def get(self, namespace, key, default=None, version=None):
+        value = cache.get(self.make_key(namespace, key, version), MISSING)
+        self.stats.record(namespace, value is not MISSING)
+        return default if value is MISSING else value
+
+    def get_many(self, namespace, keys, version=None):
+        """Значения найденных ключей: {ключ: значение}"""
+        if version is None:
+            version = self.version(namespace)
+        full_keys = {
+            self.make_key(namespace, key, version): key for key in keys
+        }
+        found = cache.get_many(full_keys)
+        for key in full_keys:
+            self.stats.record(namespace, key in found)
+        return {full_keys[key]: value for key, value in found.items()}
+
+    def set(self, namespace, key, value, timeout=None, version=None):
+        cache.set(self.make_key(namespace, key, version), value, timeout)
+
+    def set_many(self, namespace, values, timeout=None, version=None):
+        if version is None:
+            version = self.version(namespace)
+        cache.set_many(
+            {
+                self.make_key(namespace, key, version): value
+                for key, value in values.items()
+            },
+            timeout,
+        )
+
+    def bump_key(self, key):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    def bump(self, *namespaces):
+        for namespace in namespaces:
+            self.bump_key(self.version_key(namespace))
+
+    def bump_objects(self, namespace, ids):
+        for pk in ids:
+            self.bump_key(
+                OBJECT_VERSION_KEY.format(namespace=namespace, id=pk)
+            )
+
+    def invalidate_objects(self, namespace, ids):
+        """Увеличивает версии объектов после фиксации транзакции"""
+        ids = list(ids)
+        transaction.on_commit(lambda: self.bump_objects(namespace, ids))
+
+    def invalidate(self, *namespaces):
+        """
+        Единая точка инвалидации: версии пространств увеличиваются
+        после фиксации текущей транзакции, чтобы другой процесс
+        не закэшировал данные, которые еще не записаны
+        """
+        transaction.on_commit(lambda: self.bump(*namespaces))
+
+
+cache_stats = CacheStats()
+namespaced_cache = NamespacedCache(cache_stats)
+
+
+def invalidate(*namespaces):
+    namespaced_cache.invalidate(*namespaces)
+
+
+def invalidate_objects(namespace, ids):
+    namespaced_cache.invalidate_objects(namespace, ids)
+
+
+def make_etag(*parts):
+    """Сильный ETag из значений, от которых зависит представление"""
+    return '"{}"'.format(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def conditional_response(request, etag, build_response):
+    """
+    Ответ 304 на условный запрос с совпадающим ETag без построения ответа,
+    иначе ответ build_response() с заголовком ETag
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+        response['ETag'] = etag
+    return response
+
+
+class Representation:
+    """
+    Готовое JSON-представление справочника
+    Ключевые аргументы:
+    content -- сериализованные данные в байтах,
+    etag -- хэш содержимого,
+    last_modified -- время построения представления (timestamp),
+    version -- версия пространства имен, для которой оно построено
+    """
+    __slots__ = ('content', 'etag', 'last_modified', 'version')
+
+    def __init__(self, content, etag, last_modified, version):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version = version
+
+
+class CachedRepresentation:
+    """
+    Кэш сериализованного представления редко меняющихся данных
+    Представление хранится в памяти процесса и в общем кэше в пространстве
+    имен модели, актуальность копии в памяти проверяется по версии
+    пространства
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.local = None
+
+    def get(self, build_data):
+        version = namespaced_cache.version(self.namespace)
+        local = self.local
+        if local is not None and local.version == version:
+            cache_stats.record(self.namespace, True)
+            return local
+        representation = namespaced_cache.get(
+            self.namespace, REPRESENTATION_KEY, version=version
+        )
+        if representation is None:
+            representation = self.build(build_data(), version)
+        self.local = representation
+        return representation
+
+    def build(self, data, version):
+        content = FastJSONRenderer().render(data)
+        representation = Representation(
+            content,
+            '"{}"'.format(hashlib.sha1(content).hexdigest()),
+            int(time.time()),
+            version,
+        )
+        namespaced_cache.set(
+            self.namespace, REPRESENTATION_KEY, representation,
+            version=version,
+        )
+        return representation
+
+    def response(self, request, build_data):
+        representation = self.get(build_data)
+        response = HttpResponse(
+            representation.content, content_type='application/json'
+        )
+        response['ETag'] = representation.etag
+        response['Last-Modified'] = http_date(representation.last_modified)
+        return get_conditional_response(
+            request,
+            etag=representation.etag,
+            last_modified=representation.last_modified,
+            response=response,
+        )
+
+
+tags_representation = CachedRepresentation('tag')
+ingredients_representation = CachedRepresentation('ingredient')
@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+# (модель счетчика, поле счетчика, связанная модель, поле ссылки)
+COUNTERS = (
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+)
+
+
+def change_counter(model, pk, field, delta):
+    """
+    Атомарно изменяет счетчик объекта выражением F(), без чтения строки
+    Счетчик не уменьшается ниже нуля
+    """
+    if pk is None or not delta:
+        return
+    objects = model.objects.filter(pk=pk)
+    if delta < 0:
+        objects = objects.filter(**{f'{field}__gte': -delta})
+    objects.update(**{field: F(field) + delta})
+
+
+def counter_mismatches(model, field, related_model, related_field):
+    """
+    Объекты, у которых сохраненный счетчик отличается от количества
+    связанных строк; ожидаемое значение - в атрибуте 'expected'
+    """
+    related = related_model.objects.filter(
+        **{related_field: OuterRef('pk')}
+    ).order_by().values(related_field).annotate(count=Count('pk'))
+    return model.objects.annotate(expected=Coalesce(
+        Subquery(related.values('count'), output_field=IntegerField()), 0
+    )).exclude(**{field: F('expected')}).order_by('pk')
+
+
+def reconcile_counters(fix=True):
+    """
+    Сверяет счетчики с количеством связанных строк
+    При fix=True исправляет расхождения
+    Возвращает список (модель, поле, id, сохранено, ожидается)
+    """
+    mismatches = []
+    for model, field, related_model, related_field in COUNTERS:
+        objects = list(counter_mismatches(
+            model, field, related_model, related_field
+        ).only('pk', field))
+        mismatches.extend(
+            (model, field, obj.pk, getattr(obj, field), obj.expected)
+            for obj in objects
+        )
+        if not fix:
+            continue
+        for obj in objects:
+            setattr(obj, field, obj.expected)
+        model.objects.bulk_update(objects, (field,), batch_size=BATCH_SIZE)
+    return mismatches
@@ -0,0 +1,118 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from api.models import FeedEntry, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+
+
+def fan_out(recipes):
+    """
+    Добавляет рецепты в ленты подписчиков авторов (fan-out-on-write)
+    Рецепты авторов, у которых FEED_FANOUT_THRESHOLD подписчиков и больше,
+    не рассылаются и добавляются в ленты при чтении
+    Размер пачки вставки выбирает Django по ограничениям базы данных
+    """
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        if recipe.author_id is not None:
+            recipes_by_author[recipe.author_id].append(recipe.pk)
+    if not recipes_by_author:
+        return
+    authors = list(User.objects.filter(
+        pk__in=recipes_by_author,
+        followers_count__lt=settings.FEED_FANOUT_THRESHOLD,
+    ).values_list('pk', flat=True))
+    fanned_out = [
+        recipe_id
+        for author_id in authors for recipe_id in recipes_by_author[author_id]
+    ]
+    if not fanned_out:
+        return
+    followers = Follow.objects.filter(
+        author_id__in=authors
+    ).values_list('user_id', 'author_id')
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id
+            )
+            for user_id, author_id in followers.iterator()
+            for recipe_id in recipes_by_author[author_id]
+        ),
+        ignore_conflicts=True,
+    )
+    Recipe.objects.filter(pk__in=fanned_out).update(fanned_out=True)
+
+
+def follow(user_id, author_id):
+    """Добавляет в ленту подписчика разосланные ранее рецепты автора"""
+    recipe_ids = Recipe.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).values_list('pk', flat=True)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id
+            )
+            for recipe_id in recipe_ids.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def feed_page(user, size, before=None):
+    """
+    Страница ленты подписок пользователя: id рецептов по убыванию,
+    меньшие before, не больше size
+    Разосланные рецепты читаются из FeedEntry диапазоном по индексу
+    (user, recipe), остальные - из рецептов авторов-подписок
+    по частичному индексу recipe_not_fanned_out_idx; результаты сливаются
+    Возвращает (id рецептов, есть ли следующая страница)
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(
+        fanned_out=False,
+        author__in=Follow.objects.filter(user=user).values('author'),
+    )
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        pulled = pulled.filter(pk__lt=before)
+    recipe_ids = set(entries.order_by('-recipe_id').values_list(
+        'recipe_id', flat=True
+    )[:size + 1])
+    recipe_ids.update(
+        pulled.order_by('-pk').values_list('pk', flat=True)[:size + 1]
+    )
+    recipe_ids = sorted(recipe_ids, reverse=True)
+    return recipe_ids[:size], len(recipe_ids) > size
+
+
+def rebuild_feeds(chunk_size=BATCH_SIZE):
+    """
+    Пересоздает ленты подписок: рецепты авторов с числом подписчиков
+    меньше FEED_FANOUT_THRESHOLD рассылаются заново
+    Возвращает количество записей в лентах
+    """
+    FeedEntry.objects.all().delete()
+    Recipe.objects.filter(fanned_out=True).update(fanned_out=False)
+    recipes = Recipe.objects.filter(author__isnull=False).only(
+        'pk', 'author_id'
+    ).order_by('pk')
+    last_id = 0
+    while True:
+        chunk = list(recipes.filter(pk__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        fan_out(chunk)
+        last_id = chunk[-1].pk
+    return FeedEntry.objects.count()
@@ -0,0 +1,70 @@
+import base64
+import binascii
+import re
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from rest_framework import serializers
+
+from api.images import detect_extension
+
+BASE64_HEADER = re.compile(r'^data:image/[\w.+-]+;base64,')
+INVALID_IMAGE = 'Загрузите корректное изображение в формате base64.'
+IMAGE_TOO_LARGE = 'Размер изображения не должен превышать {max_size} байт.'
+
+
+class RecipeImageField(serializers.Field):
+    """
+    Ссылка на изображение рецепта нужного размера
+    Размер задается аргументом rendition или ключом 'image_rendition'
+    в контексте сериализатора, если миниатюры еще нет -
+    отдается исходное изображение
+    """
+
+    def __init__(self, rendition=None, **kwargs):
+        self.rendition = rendition
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        rendition = self.rendition or self.context.get('image_rendition')
+        file = rendition and getattr(recipe, rendition) or recipe.image
+        if not file:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return file.url
+        return request.build_absolute_uri(file.url)
+
+
+class Base64ImageUploadField(serializers.Field):
+    """
+    Изображение в base64 без декодирования Pillow: проверяются только
+    base64, размер и сигнатура формата. Изображение декодируется
+    и уменьшается после сохранения рецепта (api.image_tasks)
+    """
+    default_error_messages = {
+        'invalid': INVALID_IMAGE,
+        'max_size': IMAGE_TOO_LARGE,
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        data = BASE64_HEADER.sub('', data, count=1)
+        max_size = settings.RECIPE_IMAGE_MAX_SIZE
+        if len(data) * 3 // 4 > max_size:
+            self.fail('max_size', max_size=max_size)
+        try:
+            content = base64.b64decode(data)
+        except (binascii.Error, ValueError):
+            self.fail('invalid')
+        extension = detect_extension(content)
+        if extension is None:
+            self.fail('invalid')
+        return ContentFile(content, name=f'{uuid.uuid4()}.{extension}')
+
+    def to_representation(self, file):
+        return file.url if file else None
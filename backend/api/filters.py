@@ -3,10 +3,11 @@ from django_filters.rest_framework import (
     AllValuesMultipleFilter,
     BooleanFilter,
     CharFilter,
-    FilterSet
+    FilterSet,
+    OrderingFilter
 )
 
-from api.models import Ingredient, Recipe
+from api.models import Ingredient, Recipe, RecipeRank
 
 
 class IngredientSearchFilter(FilterSet):
@@ -34,6 +35,26 @@ class IngredientSearchFilter(FilterSet):
         return start_with_queryset.union(contain_queryset).order_by('order')
 
 
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    Сортировка рецептов по счетчикам и по рейтингу:
+    'popular' и 'trending' - по убыванию рейтинга из RecipeRank
+    """
+    rankings = {
+        RecipeRank.POPULAR: 'Популярные',
+        RecipeRank.TRENDING: 'Популярные сейчас',
+    }
+
+    def build_choices(self, fields, labels):
+        return [*super().build_choices(fields, labels), *self.rankings.items()]
+
+    def filter(self, queryset, value):
+        for mode in value or ():
+            if mode in self.rankings:
+                return queryset.order_by_rank(mode)
+        return super().filter(queryset, value)
+
+
 class RecipeFilter(FilterSet):
     tags = AllValuesMultipleFilter(field_name='tags__slug')
     author = CharFilter(lookup_expr='exact')
@@ -41,20 +62,34 @@ class RecipeFilter(FilterSet):
         method='filter_is_in_shopping_cart'
     )
     is_favorited = BooleanFilter(method='get_is_favorited')
+    ordering = RecipeOrderingFilter(
+        fields=(
+            ('favorites_count', 'favorites'),
+            ('carts_count', 'carts'),
+        ),
+    )
 
     def get_is_favorited(self, queryset, name, value):
         if not value:
             return queryset
-        favorites = self.request.user.favorites.all()
-        return queryset.filter(
-            pk__in=(favorite.recipe.pk for favorite in favorites)
-        )
+        return queryset.filter(favorites__user=self.request.user)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value:
             return queryset.filter(shopping_carts__user=self.request.user)
         return queryset.all()
 
+    def filter_queryset(self, queryset):
+        """
+        Сортировка по счетчикам ('-favorites' - самые популярные)
+        дополняется сортировкой по id, чтобы порядок был однозначным
+        """
+        queryset = super().filter_queryset(queryset)
+        ordering = queryset.query.order_by
+        if ordering and 'pk' not in ordering and '-pk' not in ordering:
+            queryset = queryset.order_by(*ordering, '-pk')
+        return queryset
+
     class Meta:
         model = Recipe
         fields = ['author', 'is_in_shopping_cart']
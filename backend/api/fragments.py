@@ -0,0 +1,69 @@
+from django.core.cache import cache
+
+from api.caching import cache_stats, namespaced_cache
+
+FRAGMENT_KEY = (
+    'fragment:recipe:{id}:{rendition}:{updated_at}:{author}:{tag}:{ingredient}'
+)
+FRAGMENT_NAMESPACE = 'recipe'
+DEPENDENCIES = ('tag', 'ingredient')
+
+
+class RecipeFragmentCache:
+    """
+    Кэш не зависящей от пользователя части представления рецепта
+    Ключ фрагмента включает время изменения рецепта, версию профиля его
+    автора и версии пространств имен тегов и ингредиентов, поэтому
+    фрагмент перестает читаться после изменения рецепта, его ингредиентов
+    и тегов, профиля автора, любого тега или ингредиента
+    Время изменения берется из того же экземпляра рецепта, из которого
+    строится фрагмент: рецепт, прочитанный до изменения, сохраняется
+    под старым ключом, а не под ключом новой версии. Профиль автора,
+    теги и ингредиенты читаются после версий, при построении фрагмента
+    Версии и фрагменты читаются двумя запросами к кэшу на страницу
+    """
+
+    def keys(self, recipes, rendition):
+        versions = namespaced_cache.versions(DEPENDENCIES, {
+            'user': {
+                recipe.author_id for recipe in recipes if recipe.author_id
+            },
+        })
+        return {
+            recipe.pk: FRAGMENT_KEY.format(
+                id=recipe.pk,
+                rendition=rendition,
+                updated_at=recipe.updated_at.timestamp(),
+                author=(
+                    versions['user', recipe.author_id]
+                    if recipe.author_id else 0
+                ),
+                tag=versions['tag'],
+                ingredient=versions['ingredient'],
+            )
+            for recipe in recipes
+        }
+
+    def get_or_build(self, recipes, rendition, build):
+        """
+        Фрагменты рецептов {id: фрагмент}
+        build(рецепты) строит недостающие фрагменты
+        """
+        keys = self.keys(recipes, rendition)
+        found = cache.get_many(keys.values())
+        fragments, missing = {}, []
+        for recipe in recipes:
+            fragment = found.get(keys[recipe.pk])
+            cache_stats.record(FRAGMENT_NAMESPACE, fragment is not None)
+            if fragment is None:
+                missing.append(recipe)
+            else:
+                fragments[recipe.pk] = fragment
+        if missing:
+            built = build(missing)
+            cache.set_many({keys[pk]: built[pk] for pk in built})
+            fragments.update(built)
+        return fragments
+
+
+recipe_fragments = RecipeFragmentCache()
@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api.images import image_options, process_image
+from api.models import Recipe
+
+logger = logging.getLogger('foodgram.images')
+
+IMAGE_PROCESSING_FAILED = 'Не удалось обработать изображение рецепта %s'
+
+
+def read_image(name):
+    with default_storage.open(name, 'rb') as file:
+        return file.read()
+
+
+def save_renditions(recipe_id, source, renditions, extension):
+    """
+    Сохраняет размеры изображения и отмечает рецепт обработанным
+    Если рецепт удален или его изображение за это время заменили,
+    результат отбрасывается
+    """
+    base = os.path.splitext(source)[0]
+    names = {
+        field: default_storage.save(
+            f'{base}.{extension}' if field == 'image'
+            else f'{base}_{field}.{extension}',
+            ContentFile(content),
+        )
+        for field, content in renditions.items()
+    }
+    updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_status=Recipe.IMAGE_READY, updated_at=timezone.now(), **names
+    )
+    if not updated:
+        unused = names.values()
+    elif source not in names.values():
+        unused = [source]
+    else:
+        unused = []
+    for name in unused:
+        default_storage.delete(name)
+    return bool(updated)
+
+
+def mark_failed(recipe_id, source):
+    logger.exception(IMAGE_PROCESSING_FAILED, recipe_id)
+    Recipe.objects.filter(pk=recipe_id, image=source).update(
+        image_status=Recipe.IMAGE_FAILED, updated_at=timezone.now()
+    )
+
+
+def process_recipe_image(recipe_id, source):
+    """Обрабатывает изображение рецепта в текущем потоке"""
+    try:
+        renditions, extension = process_image(
+            read_image(source), image_options()
+        )
+    except Exception:
+        mark_failed(recipe_id, source)
+        return False
+    return save_renditions(recipe_id, source, renditions, extension)
+
+
+class ImageQueue:
+    """
+    Обработка изображений рецептов вне потока запроса:
+    декодирование, проверка и создание миниатюр выполняются
+    в пуле из RECIPE_IMAGE_WORKERS процессов, результат сохраняется
+    в потоке пула. Ожидающих задач не больше RECIPE_IMAGE_QUEUE_SIZE,
+    при переполненной очереди или RECIPE_IMAGE_WORKERS = 0
+    изображение обрабатывается в потоке запроса
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def get_executor(self):
+        if not settings.RECIPE_IMAGE_WORKERS:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.RECIPE_IMAGE_WORKERS,
+                    mp_context=get_context('spawn'),
+                )
+                self._slots = threading.BoundedSemaphore(
+                    settings.RECIPE_IMAGE_QUEUE_SIZE
+                )
+            return self._executor
+
+    def reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def schedule(self, recipe):
+        """Запускает обработку после фиксации транзакции"""
+        transaction.on_commit(
+            partial(self.submit, recipe.pk, recipe.image.name)
+        )
+
+    def submit(self, recipe_id, source):
+        executor = self.get_executor()
+        if executor is None or not self._slots.acquire(blocking=False):
+            return process_recipe_image(recipe_id, source)
+        slots = self._slots
+        try:
+            future = executor.submit(
+                process_image, read_image(source), image_options()
+            )
+        except RuntimeError:
+            slots.release()
+            self.reset()
+            return process_recipe_image(recipe_id, source)
+        except Exception:
+            slots.release()
+            mark_failed(recipe_id, source)
+            return False
+        future.add_done_callback(
+            partial(
+                self.finish, recipe_id, source, slots, threading.get_ident()
+            )
+        )
+        return True
+
+    def finish(self, recipe_id, source, slots, submitter, future):
+        """
+        Сохраняет результат в потоке пула; соединения с базой данных
+        этого потока закрываются, если это не поток запроса
+        """
+        slots.release()
+        try:
+            try:
+                renditions, extension = future.result()
+            except Exception:
+                mark_failed(recipe_id, source)
+            else:
+                save_renditions(recipe_id, source, renditions, extension)
+        except Exception:
+            logger.exception(IMAGE_PROCESSING_FAILED, recipe_id)
+        finally:
+            if threading.get_ident() != submitter:
+                connections.close_all()
+
+
+image_queue = ImageQueue()
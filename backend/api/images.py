@@ -0,0 +1,103 @@
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+FORMAT_EXTENSIONS = {
+    'WEBP': 'webp',
+    'JPEG': 'jpg',
+}
+FALLBACK_FORMAT = 'JPEG'
+BACKGROUND_COLOR = (255, 255, 255)
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+)
+
+
+def get_output_format():
+    output_format = settings.RECIPE_IMAGE_FORMAT.upper()
+    if output_format == 'WEBP' and not features.check('webp'):
+        return FALLBACK_FORMAT
+    return output_format
+
+
+def prepare(image, output_format):
+    """
+    Приводит изображение к режиму, поддерживаемому форматом:
+    JPEG не поддерживает прозрачность, она заменяется белым фоном
+    """
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        image = image.convert('RGBA')
+        if output_format == 'JPEG':
+            background = Image.new('RGB', image.size, BACKGROUND_COLOR)
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image
+    return image.convert('RGB')
+
+
+def detect_extension(content):
+    """
+    Расширение файла по сигнатуре формата, без декодирования изображения
+    None - если формат не поддерживается
+    """
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if content.startswith(signature):
+            return extension
+    return None
+
+
+def image_options():
+    """
+    Параметры обработки из настроек: передаются в процесс-обработчик,
+    которому не нужны настройки Django
+    """
+    return {
+        'format': get_output_format(),
+        'quality': settings.RECIPE_IMAGE_QUALITY,
+        'renditions': dict(settings.RECIPE_IMAGE_RENDITIONS),
+    }
+
+
+def encode(image, output_format, quality):
+    buffer = BytesIO()
+    options = {'quality': quality}
+    if output_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    image.save(buffer, format=output_format, **options)
+    return buffer.getvalue()
+
+
+def process_image(content, options):
+    """
+    Декодирует и проверяет изображение один раз и кодирует все размеры
+    из options['renditions'] в формате options['format']
+    Каждый следующий размер уменьшается из предыдущего,
+    а не из исходного изображения
+    Возвращает словарь {поле модели: байты изображения}
+    и расширение файлов
+    """
+    output_format = options['format']
+    with Image.open(BytesIO(content)) as image:
+        image.draft('RGB', max(options['renditions'].values()))
+        image = prepare(image, output_format)
+    renditions = {}
+    for field, size in sorted(
+        options['renditions'].items(),
+        key=lambda item: item[1], reverse=True,
+    ):
+        image.thumbnail(size, Image.LANCZOS)
+        renditions[field] = encode(image, output_format, options['quality'])
+    return renditions, FORMAT_EXTENSIONS.get(
+        output_format, output_format.lower()
+    )
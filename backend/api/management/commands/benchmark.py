@@ -0,0 +1,51 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import compare, run
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет время ответа, количество запросов и выделение памяти '
+        'для основных эндпоинтов API и сохраняет отчет в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument(
+            '--no-allocations', action='store_true',
+            help='Не замерять выделение памяти (tracemalloc)',
+        )
+        parser.add_argument(
+            '--only', action='append',
+            help='Запускать только сценарии, содержащие подстроку',
+        )
+        parser.add_argument('--output', help='Файл для отчета в JSON')
+        parser.add_argument(
+            '--compare', help='Отчет JSON, с которым сравнить результаты',
+        )
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        report = run(
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            allocations=not options['no_allocations'],
+            only=options['only'],
+        )
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f'{name:<55} {result["p50_ms"]:>9.2f} ms '
+                f'{result["queries"]:>4} queries'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)
+            for line in compare(baseline, report):
+                self.stdout.write(line)
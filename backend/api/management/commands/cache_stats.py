@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api.caching import cache_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит счетчики попаданий и промахов общего кэша '
+        'по пространствам имен моделей (сумма по всем процессам)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Обнулить счетчики',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            cache_stats.reset()
+            return
+        for namespace, counters in cache_stats.shared().items():
+            total = counters['hits'] + counters['misses']
+            ratio = counters['hits'] / total * 100 if total else 0
+            self.stdout.write(
+                f'{namespace:<15} hits: {counters["hits"]:>8} '
+                f'misses: {counters["misses"]:>8} hit ratio: {ratio:.1f}%'
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import REPRESENTATION_RENDITIONS, representation_mismatches
+from api.models import Recipe
+
+CHUNK_SIZE = 500
+REPRESENTATIONS_MISMATCH = 'Расхождений в представлениях рецептов: {count}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает представления всех рецептов, построенные без '
+        'сериализаторов DRF (RECIPE_FAST_REPRESENTATION), '
+        'с представлениями RecipeFragmentSerializer'
+    )
+
+    def handle(self, *args, **options):
+        mismatches = []
+        recipes = Recipe.objects.order_by('pk')
+        last_id = 0
+        while True:
+            chunk = list(recipes.filter(pk__gt=last_id)[:CHUNK_SIZE])
+            if not chunk:
+                break
+            for rendition in REPRESENTATION_RENDITIONS:
+                mismatches.extend(
+                    (pk, rendition or 'image')
+                    for pk in representation_mismatches(chunk, rendition)
+                )
+            last_id = chunk[-1].pk
+        for pk, rendition in mismatches:
+            self.stdout.write(f'recipe={pk} [{rendition}]')
+        if mismatches:
+            raise CommandError(
+                REPRESENTATIONS_MISMATCH.format(count=len(mismatches))
+            )
+        self.stdout.write(self.style.SUCCESS('Расхождений нет'))
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.models import Ingredient, Recipe, ShoppingCartIngredient, Tag
+from users.models import User
+
+SEARCH_VALUE = 'мол'
+RECIPES_LIMIT = 3
+PAGE_SIZE = 6
+NO_USERS = 'В базе нет пользователей'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит планы выполнения (EXPLAIN) основных запросов API, '
+        'чтобы сравнить их до и после изменения индексов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int,
+            help='id пользователя, от имени которого строятся запросы',
+        )
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='Выполнить запросы (EXPLAIN ANALYZE), только PostgreSQL',
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(pk=options['user']).first()
+            if options['user'] else
+            User.objects.order_by('pk').first()
+        )
+        if user is None:
+            raise CommandError(NO_USERS)
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+        for name, queryset in self.get_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def get_queries(self, user):
+        slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        authors = User.objects.filter(following__user=user)
+        return (
+            (
+                'Список рецептов с флагами избранного и списка покупок',
+                Recipe.objects.with_user_flags(user)[:PAGE_SIZE],
+            ),
+            (
+                'Фильтр рецептов по тегам',
+                Recipe.objects.filter(tags__slug__in=slugs)[:PAGE_SIZE],
+            ),
+            (
+                'Фильтр избранных рецептов',
+                Recipe.objects.filter(favorites__user=user)[:PAGE_SIZE],
+            ),
+            (
+                'Фильтр рецептов в списке покупок',
+                Recipe.objects.filter(
+                    shopping_carts__user=user)[:PAGE_SIZE],
+            ),
+            (
+                'Поиск ингредиентов по началу названия',
+                Ingredient.objects.filter(name__istartswith=SEARCH_VALUE),
+            ),
+            (
+                'Поиск ингредиентов по вхождению в название',
+                Ingredient.objects.filter(name__icontains=SEARCH_VALUE),
+            ),
+            (
+                'Подписки пользователя',
+                authors.order_by('id')[:PAGE_SIZE],
+            ),
+            (
+                'Последние рецепты авторов из подписок',
+                Recipe.objects.filter(author__in=authors).limit_per_author(
+                    RECIPES_LIMIT
+                ),
+            ),
+            (
+                'Список покупок',
+                ShoppingCartIngredient.objects.filter(
+                    user=user
+                ).select_related('ingredient'),
+            ),
+        )
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api.recipe_batch import IMAGE_FORMATS, export_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает все рецепты в NDJSON в формате import_recipes '
+        '(для резервных копий и переноса между окружениями)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Файл, по умолчанию - stdout')
+        parser.add_argument(
+            '--images', choices=IMAGE_FORMATS, default='base64',
+            help='Изображения ссылками или в base64 (по умолчанию)',
+        )
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        lines = export_recipes(
+            options['images'], chunk_size=options['chunk_size']
+        )
+        if not options['output']:
+            sys.stdout.writelines(lines)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            file.writelines(lines)
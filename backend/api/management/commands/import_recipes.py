@@ -0,0 +1,60 @@
+import json
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.parsers import parse_ndjson
+from api.recipe_batch import import_recipes
+
+User = get_user_model()
+
+AUTHOR_NOT_FOUND = 'Пользователь {author} не найден'
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует рецепты из файла NDJSON (по рецепту на строку, '
+        '"-" - стандартный ввод) от имени автора; ошибки выводятся '
+        'по номерам строк'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--author', required=True,
+            help='username или email автора рецептов',
+        )
+        parser.add_argument('--chunk-size', type=int)
+
+    def get_author(self, author):
+        user = User.objects.filter(username=author).first() or (
+            User.objects.filter(email=author).first()
+        )
+        if user is None:
+            raise CommandError(AUTHOR_NOT_FOUND.format(author=author))
+        return user
+
+    def handle(self, *args, **options):
+        author = self.get_author(options['author'])
+        if options['path'] == '-':
+            return self.load(sys.stdin.buffer, author, options)
+        with open(options['path'], 'rb') as file:
+            return self.load(file, author, options)
+
+    def load(self, file, author, options):
+        created = failed = 0
+        for result in import_recipes(
+            parse_ndjson(file), author, options['chunk_size']
+        ):
+            if 'id' in result:
+                created += 1
+                continue
+            failed += 1
+            self.stderr.write(
+                f'Строка {result["line"]}: '
+                + json.dumps(result['errors'], ensure_ascii=False)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано рецептов: {created}, с ошибками: {failed}'
+        ))
@@ -0,0 +1,127 @@
+import csv
+import json
+import os
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.caching import invalidate
+from api.models import Ingredient
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+CSV_HEADER = ('name', 'measurement_unit')
+FORMATS = ('csv', 'json')
+UNKNOWN_FORMAT = 'Не удалось определить формат файла {path}'
+INVALID_JSON = 'Ожидается JSON-массив объектов ингредиентов'
+SEPARATOR = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) < 2 or tuple(row[:2]) == CSV_HEADER:
+            continue
+        yield row[0], row[1]
+
+
+def iter_json_array(file):
+    """
+    Читает элементы JSON-массива по одному,
+    не загружая файл в память целиком
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError(INVALID_JSON)
+    position = 1
+    while True:
+        position = SEPARATOR.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError(INVALID_JSON)
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item
+
+
+def read_json(file):
+    for item in iter_json_array(file):
+        if not isinstance(item, dict):
+            raise CommandError(INVALID_JSON)
+        yield item.get('name', ''), item.get('measurement_unit', '')
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV (название, единица измерения) '
+        'или JSON-файла. Уже существующие ингредиенты пропускаются, '
+        'поэтому команду можно запускать повторно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с ингредиентами')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла, по умолчанию определяется по расширению',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Количество ингредиентов в одном INSERT',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(UNKNOWN_FORMAT.format(path=path))
+        started = time.perf_counter()
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            read, created = self.load(
+                READERS[file_format](file), options['batch_size']
+            )
+        elapsed = time.perf_counter() - started
+        invalidate('ingredient')
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано: {read}, добавлено: {created}, '
+            f'пропущено: {read - created}, '
+            f'время: {elapsed:.2f} с, '
+            f'скорость: {read / elapsed if elapsed else 0:.0f} строк/с'
+        ))
+
+    def load(self, rows, batch_size):
+        seen = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        batch_size = min(batch_size, connection.ops.bulk_batch_size(
+            ('name', 'measurement_unit'), ()
+        ))
+        read = created = 0
+        batch = []
+        for name, measurement_unit in rows:
+            read += 1
+            key = (name.strip(), measurement_unit.strip())
+            if not key[0] or key in seen:
+                continue
+            seen.add(key)
+            batch.append(Ingredient(name=key[0], measurement_unit=key[1]))
+            if len(batch) >= batch_size:
+                created += len(Ingredient.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created += len(Ingredient.objects.bulk_create(batch))
+        return read, created
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.image_tasks import process_recipe_image
+from api.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пережимает изображения рецептов и создает миниатюры '
+        'для рецептов, у которых их еще нет или обработка не завершилась '
+        '(--all - для всех)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(
+                Q(thumbnail='') | ~Q(image_status=Recipe.IMAGE_READY)
+            )
+        processed = failed = 0
+        for recipe_id, source in recipes.values_list(
+            'pk', 'image'
+        ).iterator():
+            if process_recipe_image(recipe_id, source):
+                processed += 1
+            else:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe_id}: ошибка обработки')
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано: {processed}, с ошибками: {failed}'
+        ))
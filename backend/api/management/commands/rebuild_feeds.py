@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересоздает ленты подписок: рецепты авторов, у которых меньше '
+        'FEED_FANOUT_THRESHOLD подписчиков, рассылаются в ленты заново; '
+        'нужно после изменения порога и для рецептов, '
+        'опубликованных до появления лент'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            entries = rebuild_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {entries}'
+        ))
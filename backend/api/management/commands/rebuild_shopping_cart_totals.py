@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import ShoppingCartIngredient
+from api.shopping_cart import (
+    expected_shopping_cart_totals,
+    stored_shopping_cart_totals,
+)
+
+BATCH_SIZE = 1000
+TOTALS_MISMATCH = 'Расхождений в списках покупок: {count}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает суммы ингредиентов в списках покупок '
+        'или проверяет их (--verify)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить сохраненные суммы с пересчитанными',
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, можно указать несколько раз',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        expected = expected_shopping_cart_totals(user_ids)
+        if options['verify']:
+            return self.verify(expected, stored_shopping_cart_totals(user_ids))
+        totals = ShoppingCartIngredient.objects.all()
+        if user_ids is not None:
+            totals = totals.filter(user_id__in=user_ids)
+        with transaction.atomic():
+            totals.delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                (
+                    ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount,
+                    )
+                    for (user_id, ingredient_id), total_amount
+                    in expected.items()
+                ),
+                batch_size=BATCH_SIZE,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано сумм ингредиентов: {len(expected)}'
+        ))
+
+    def verify(self, expected, stored):
+        mismatches = [
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        for user_id, ingredient_id in sorted(mismatches):
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'ожидается {expected.get((user_id, ingredient_id))}, '
+                f'сохранено {stored.get((user_id, ingredient_id))}'
+            )
+        if mismatches:
+            raise CommandError(TOTALS_MISMATCH.format(count=len(mismatches)))
+        self.stdout.write(self.style.SUCCESS('Расхождений нет'))
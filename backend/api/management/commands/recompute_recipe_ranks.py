@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api.ranking import recompute_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг рецептов для сортировок popular и trending '
+        'по добавлениям в избранное и в списки покупок с прошлого пересчета; '
+        'запускается периодически (например, из cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинг по всем добавлениям заново',
+        )
+
+    def handle(self, *args, **options):
+        updated = recompute_ranks(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлен рейтинг рецептов: {updated}'
+        ))
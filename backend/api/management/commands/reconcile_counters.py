@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.counters import reconcile_counters
+
+COUNTERS_MISMATCH = 'Расхождений в счетчиках: {count}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики рецептов и подписчиков автора, '
+        'добавлений в избранное '
+        'и в списки покупок с данными и исправляет расхождения '
+        'или только проверяет их (--verify)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сравнить сохраненные счетчики с пересчитанными',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        with transaction.atomic():
+            mismatches = reconcile_counters(fix=not verify)
+        for model, field, pk, stored, expected in mismatches:
+            self.stdout.write(
+                f'{model._meta.model_name}={pk} {field}: '
+                f'ожидается {expected}, сохранено {stored}'
+            )
+        if verify and mismatches:
+            raise CommandError(COUNTERS_MISMATCH.format(count=len(mismatches)))
+        if verify:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: {len(mismatches)}'
+        ))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from api.benchmarks import clear_benchmark_data, seed
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает синтетические данные для замеров производительности: '
+        'пользователей, рецепты, избранное, списки покупок и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument(
+            '--heavy-cart', type=int, default=500,
+            help='Размер списка покупок первого пользователя',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданные тестовые данные',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_benchmark_data()
+        created = seed(
+            users=options['users'],
+            recipes=options['recipes'],
+            ingredients=options['ingredients'],
+            tags=options['tags'],
+            favorites_per_user=options['favorites_per_user'],
+            carts_per_user=options['carts_per_user'],
+            follows_per_user=options['follows_per_user'],
+            heavy_cart=options['heavy_cart'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(', '.join(
+            f'{name}: {count}' for name, count in created.items()
+        )))
@@ -0,0 +1,108 @@
+# Generated by Django 2.2.28 on 2026-10-17 05:59
+
+from django.db import DatabaseError, migrations, models, transaction
+from django.db.models import Count, Min, Sum
+
+INGREDIENT_NAME_INDEXES = (
+    (
+        'api_ingredient_name_upper_like',
+        'CREATE INDEX IF NOT EXISTS api_ingredient_name_upper_like '
+        'ON api_ingredient (UPPER("name"::text) text_pattern_ops)',
+    ),
+    (
+        'api_ingredient_name_upper_trgm',
+        'CREATE INDEX IF NOT EXISTS api_ingredient_name_upper_trgm '
+        'ON api_ingredient USING gin (UPPER("name"::text) gin_trgm_ops)',
+    ),
+)
+
+
+def make_tag_slugs_unique(apps, schema_editor):
+    Tag = apps.get_model('api', 'Tag')
+    duplicates = Tag.objects.values('slug').annotate(
+        count=Count('id'), first_id=Min('id')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        for tag in Tag.objects.filter(slug=duplicate['slug']).exclude(
+            id=duplicate['first_id']
+        ):
+            tag.slug = f'{tag.slug}-{tag.id}'
+            tag.save(update_fields=('slug',))
+
+
+def merge_duplicate_recipe_ingredients(apps, schema_editor):
+    CountOfIngredient = apps.get_model('api', 'CountOfIngredient')
+    duplicates = CountOfIngredient.objects.values(
+        'recipe', 'ingredient'
+    ).annotate(
+        count=Count('id'), first_id=Min('id'), total=Sum('amount')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        CountOfIngredient.objects.filter(
+            id=duplicate['first_id']
+        ).update(amount=duplicate['total'])
+        CountOfIngredient.objects.filter(
+            recipe=duplicate['recipe'], ingredient=duplicate['ingredient']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+def create_ingredient_name_indexes(apps, schema_editor):
+    """
+    Индексы для поиска ингредиентов по началу (istartswith)
+    и по вхождению (icontains) названия, только для PostgreSQL
+    Триграммный индекс пропускается, если расширение pg_trgm
+    недоступно
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    (_, like_index), (_, trigram_index) = INGREDIENT_NAME_INDEXES
+    schema_editor.execute(like_index)
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            schema_editor.execute(trigram_index)
+    except DatabaseError:
+        pass
+
+
+def drop_ingredient_name_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in INGREDIENT_NAME_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            make_tag_slugs_unique, migrations.RunPython.noop
+        ),
+        migrations.RunPython(
+            merge_duplicate_recipe_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='slug',
+            field=models.SlugField(max_length=200, unique=True, verbose_name='Слаг'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['user', 'recipe'], name='favorite_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-id'], name='recipe_author_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='countofingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_ingredient_in_recipe'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_indexes, drop_ingredient_name_indexes
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='small_thumbnail',
+            field=models.ImageField(blank=True, upload_to='', verbose_name='Маленькая миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='', verbose_name='Миниатюра'),
+        ),
+    ]
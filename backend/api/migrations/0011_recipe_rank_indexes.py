@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='reciperank',
+            name='recipe_rank_popular_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reciperank',
+            name='recipe_rank_trending_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-popular_score', '-recipe'], name='recipe_rank_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reciperank',
+            index=models.Index(fields=['-trending_score', '-recipe'], name='recipe_rank_trending_idx'),
+        ),
+    ]
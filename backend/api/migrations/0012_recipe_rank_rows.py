@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-17 06:45
+
+from django.db import migrations
+
+
+def create_rank_rows(apps, schema_editor):
+    Recipe = apps.get_model('api', 'Recipe')
+    RecipeRank = apps.get_model('api', 'RecipeRank')
+    RecipeRank.objects.bulk_create(
+        (
+            RecipeRank(recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                rank__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+# Отдельно от изменения индексов (0011): в PostgreSQL после вставки
+# в той же транзакции остаются отложенные проверки внешних ключей,
+# и ALTER TABLE завершается ошибкой
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_recipe_rank_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rank_rows, migrations.RunPython.noop),
+    ]
@@ -4,3 +4,20 @@ from rest_framework import mixins, viewsets
 class ListRetrieveViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
                           viewsets.GenericViewSet):
     pass
+
+
+class CachedListMixin:
+    """
+    Отдает полный список объектов из кэша готовых представлений
+    с заголовками ETag/Last-Modified и ответом 304 на условные запросы
+    Запросы с параметрами и не-JSON форматы обрабатываются как обычно
+    """
+    cached_representation = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+        return self.cached_representation.response(
+            request,
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+        )
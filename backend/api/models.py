@@ -1,6 +1,20 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    OuterRef,
+    Value,
+    Window,
+    When
+)
+from django.db.models.functions import Greatest, RowNumber
+from django.utils import timezone
+
+from users.models import Follow, MaintainedFieldsMixin
 
 User = get_user_model()
 
@@ -27,7 +41,7 @@ class Tag(models.Model):
     """Модель тэгов"""
     name = models.CharField('Название', max_length=200)
     color = models.CharField('Цвет в HEX', max_length=7)
-    slug = models.SlugField('Слаг', max_length=200)
+    slug = models.SlugField('Слаг', max_length=200, unique=True)
 
     class Meta:
         verbose_name = 'Тег'
@@ -37,8 +51,84 @@ class Tag(models.Model):
         return f'{self.name}'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet рецептов"""
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует рецепты флагами 'is_favorited', 'is_in_shopping_cart'
+        и 'is_author_subscribed' для пользователя одним запросом
+        вместо запроса на каждый рецепт
+        """
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, BooleanField()),
+                is_in_shopping_cart=Value(False, BooleanField()),
+                is_author_subscribed=Value(False, BooleanField()),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_author_subscribed=Exists(Follow.objects.filter(
+                user=user, author=OuterRef('author'))),
+        )
+
+    def touch(self):
+        """
+        Отмечает рецепты измененными: обновляет 'updated_at'
+        Вызывается при изменениях, которые не проходят через Recipe.save():
+        теги рецепта, правка тегов и ингредиентов, обработка изображения
+        """
+        return self.update(updated_at=timezone.now())
+
+    def order_by_rank(self, mode):
+        """
+        Сортирует рецепты по убыванию рейтинга из RecipeRank
+        mode -- 'popular' или 'trending'
+        Строка рейтинга создается вместе с рецептом, поэтому соединение
+        внутреннее, а сортировка - по столбцу рейтинга без выражений,
+        по индексу (рейтинг, рецепт)
+        """
+        return self.filter(rank__isnull=False).annotate(
+            rank_score=F(f'rank__{RecipeRank.SCORE_FIELDS[mode]}')
+        ).order_by('-rank_score', '-pk')
+
+    def limit_per_author(self, limit):
+        """
+        Оставляет не более limit последних рецептов каждого автора
+        Ограничение применяется в базе данных оконной функцией
+        ROW_NUMBER() OVER (PARTITION BY author ORDER BY id DESC)
+        """
+        ranked = self.order_by().annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('pk').desc(),
+        )).values('pk', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        quote_name = connection.ops.quote_name
+        return self.extra(
+            where=[
+                f'{quote_name(self.model._meta.db_table)}.{quote_name("id")} '
+                f'IN (SELECT {quote_name("id")} FROM ({sql}) ranked '
+                f'WHERE {quote_name("row_number")} <= %s)'
+            ],
+            params=(*params, limit),
+        )
+
+
+class Recipe(MaintainedFieldsMixin, models.Model):
     """Модель рецептов"""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUSES = (
+        (IMAGE_PENDING, 'Обрабатывается'),
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    )
+
     ingredients = models.ManyToManyField(
         'Ingredient',
         related_name='recipes',
@@ -49,6 +139,14 @@ class Recipe(models.Model):
         verbose_name='Теги'
     )
     image = models.ImageField('Картинка')
+    thumbnail = models.ImageField('Миниатюра', blank=True)
+    small_thumbnail = models.ImageField('Маленькая миниатюра', blank=True)
+    image_status = models.CharField(
+        'Обработка изображения',
+        max_length=10,
+        choices=IMAGE_STATUSES,
+        default=IMAGE_READY,
+    )
     name = models.CharField('Название', max_length=200)
     text = models.TextField('Описание')
     cooking_time = models.PositiveIntegerField(
@@ -61,11 +159,52 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Автор',
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное', default=0, editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        'Добавлений в списки покупок', default=0, editable=False
+    )
+    fanned_out = models.BooleanField(
+        'Разослан в ленты подписчиков', default=False, editable=False
+    )
+    updated_at = models.DateTimeField('Изменен', auto_now=True)
+
+    MAINTAINED_FIELDS = ('favorites_count', 'carts_count', 'fanned_out')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pk',)
+        indexes = (
+            models.Index(
+                fields=('author', '-id'), name='recipe_author_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-id'),
+                name='recipe_favorites_count_idx',
+            ),
+            models.Index(
+                fields=('author', '-id'),
+                name='recipe_not_fanned_out_idx',
+                condition=models.Q(fanned_out=False),
+            ),
+        )
+
+
+class CountOfIngredientManager(models.Manager):
+    """Менеджер количества ингредиентов"""
+
+    def amounts(self, recipe_id):
+        """Возвращает словарь {id ингредиента: количество} для рецепта"""
+        amounts = {}
+        for ingredient_id, amount in self.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'):
+            amounts[ingredient_id] = amounts.get(ingredient_id, 0) + amount
+        return amounts
 
 
 class CountOfIngredient(models.Model):
@@ -89,9 +228,17 @@ class CountOfIngredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = CountOfIngredientManager()
+
     class Meta:
         verbose_name = 'Количество ингредиента'
         verbose_name_plural = 'Количество ингредиентов'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_ingredient_in_recipe',
+            ),
+        )
 
 
 class Favorite(models.Model):
@@ -100,7 +247,8 @@ class Favorite(models.Model):
     авторми
     Ключевые аргументы:
     user -- ссылка на объект пользователя, который подписывается,
-    recipe -- ссылка на объект рецепта, на который подписываются
+    recipe -- ссылка на объект рецепта, на который подписываются,
+    created -- время добавления, используется в рейтинге рецептов
     """
     recipe = models.ForeignKey(
         Recipe,
@@ -114,6 +262,9 @@ class Favorite(models.Model):
         related_name='favorites',
         verbose_name='Пользователь',
     )
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -124,6 +275,11 @@ class Favorite(models.Model):
                 name='unique_recipes_user',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('user', 'recipe'), name='favorite_user_recipe_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} -> {self.recipe}'
@@ -135,7 +291,8 @@ class ShoppingCart(models.Model):
     пользователями
     Ключевые аргументы:
     user -- ссылка на объект пользователя,
-    recipe -- ссылка на объект рецепта
+    recipe -- ссылка на объект рецепта,
+    created -- время добавления, используется в рейтинге рецептов
     """
     user = models.ForeignKey(
         User, on_delete=models.CASCADE,
@@ -145,6 +302,9 @@ class ShoppingCart(models.Model):
         Recipe, on_delete=models.CASCADE,
         related_name='shopping_carts', verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        'Дата добавления', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         ordering = ['-id']
@@ -156,3 +316,195 @@ class ShoppingCart(models.Model):
         ]
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class ShoppingCartIngredientManager(models.Manager):
+    """
+    Менеджер суммарного количества ингредиентов в списках покупок
+    """
+
+    def change_amounts(self, user_ids, amounts):
+        """
+        Изменяет суммы ингредиентов в списках покупок пользователей
+        Сумма не опускается ниже нуля: при расхождении с рецептами
+        вычитание не нарушает ограничение положительного поля,
+        строки с нулевой суммой удаляются
+        Ключевые аргументы:
+        user_ids -- id пользователей, чьи списки изменяются,
+        amounts -- словарь {id ингредиента: изменение количества}
+        """
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0
+                )
+                for user_id in user_ids for ingredient_id in amounts
+            ),
+            ignore_conflicts=True,
+        )
+        totals = self.filter(user_id__in=user_ids, ingredient_id__in=amounts)
+        totals.update(total_amount=Greatest(
+            F('total_amount') + Case(
+                *(
+                    When(ingredient_id=ingredient_id, then=Value(amount))
+                    for ingredient_id, amount in amounts.items()
+                ),
+                output_field=models.IntegerField()
+            ),
+            Value(0),
+            output_field=models.IntegerField()
+        ))
+        totals.filter(total_amount=0).delete()
+
+    def change_recipe_amounts(self, recipe, old_amounts, new_amounts):
+        """
+        Переносит изменение ингредиентов рецепта в списки покупок
+        всех пользователей, добавивших рецепт
+        """
+        amounts = {
+            ingredient_id: new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        if not any(amounts.values()):
+            return
+        user_ids = list(
+            recipe.shopping_carts.values_list('user_id', flat=True)
+        )
+        self.change_amounts(user_ids, amounts)
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Модель для хранения суммарного количества ингредиентов
+    в списке покупок пользователя
+    Поддерживается при добавлении и удалении рецептов из списка покупок
+    и при изменении ингредиентов рецепта
+    Ключевые аргументы:
+    user -- ссылка на объект пользователя,
+    ingredient -- ссылка на объект ингредиента,
+    total_amount -- суммарное количество ингредиента
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient, on_delete=models.CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Количество')
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_ingredient_in_shopping_cart'
+            )
+        ]
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан
+    пользователь. Записи создаются при публикации рецепта (fan-out)
+    для авторов, у которых меньше FEED_FANOUT_THRESHOLD подписчиков;
+    рецепты остальных авторов добавляются в ленту при чтении
+    Ключевые аргументы:
+    user -- ссылка на объект пользователя, владельца ленты,
+    recipe -- ссылка на объект рецепта,
+    author -- ссылка на автора рецепта, для удаления записей при отписке
+    Лента читается по индексу ограничения unique_feed_entry (user, recipe)
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='feed_entries', verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE,
+        related_name='feed_entries', verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+', verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'), name='unique_feed_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'author'), name='feed_entry_user_author_idx'
+            ),
+        )
+
+
+class RecipeRank(models.Model):
+    """
+    Рейтинг рецепта по добавлениям в избранное и в списки покупок
+    Строка создается вместе с рецептом (api.ranking.create_ranks),
+    рейтинг пересчитывается командой recompute_recipe_ranks
+    Ключевые аргументы:
+    recipe -- ссылка на объект рецепта,
+    popular_score -- взвешенное число добавлений за все время,
+    trending_score -- то же с затуханием: вклад добавления уменьшается
+    вдвое за RECIPE_TRENDING_HALF_LIFE
+    """
+    POPULAR = 'popular'
+    TRENDING = 'trending'
+    SCORE_FIELDS = {
+        POPULAR: 'popular_score',
+        TRENDING: 'trending_score',
+    }
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, primary_key=True,
+        related_name='rank', verbose_name='Рецепт'
+    )
+    popular_score = models.FloatField('Популярность', default=0)
+    trending_score = models.FloatField('Популярность сейчас', default=0)
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = (
+            models.Index(
+                fields=('-popular_score', '-recipe'),
+                name='recipe_rank_popular_idx',
+            ),
+            models.Index(
+                fields=('-trending_score', '-recipe'),
+                name='recipe_rank_trending_idx',
+            ),
+        )
+
+
+class RankCheckpoint(models.Model):
+    """
+    Момент, до которого учтены добавления в избранное и в списки покупок
+    при последнем пересчете рейтинга; хранится одна запись
+    """
+    computed_until = models.DateTimeField('Учтено до')
+
+    class Meta:
+        verbose_name = 'Пересчет рейтинга'
+        verbose_name_plural = 'Пересчеты рейтинга'
@@ -0,0 +1,71 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+INVALID_JSON = 'Некорректный JSON: {error}'
+NOT_AN_OBJECT = 'Ожидается JSON-объект'
+JSON_PARSE_ERROR = 'JSON parse error - {error}'
+UTF8_ENCODINGS = ('utf-8', 'utf8')
+
+
+def loads(content):
+    """json.loads на orjson, если он установлен"""
+    if orjson is None:
+        return json.loads(content)
+    return orjson.loads(content)
+
+
+def parse_ndjson(lines):
+    """
+    Разбирает NDJSON построчно, не читая поток целиком
+    Возвращает тройки (номер строки, объект, ошибка),
+    ошибка строки не прерывает разбор остальных, пустые строки пропускаются
+    """
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = loads(line)
+        except ValueError as error:
+            yield number, None, INVALID_JSON.format(error=error)
+            continue
+        if not isinstance(data, dict):
+            yield number, None, NOT_AN_OBJECT
+            continue
+        yield number, data, None
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер потока NDJSON: request.data - итератор троек parse_ndjson
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return parse_ndjson(stream)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser на orjson для тел запросов в UTF-8;
+    без установленного orjson и для других кодировок
+    работает стандартный парсер
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower() not in UTF8_ENCODINGS:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(JSON_PARSE_ERROR.format(error=error))
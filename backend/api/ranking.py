@@ -0,0 +1,134 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import (
+    Favorite,
+    RankCheckpoint,
+    Recipe,
+    RecipeRank,
+    ShoppingCart
+)
+
+BATCH_SIZE = 1000
+MIN_TRENDING_SCORE = 1e-6
+CHECKPOINT_ID = 1
+
+# (модель добавлений, ключ веса в RECIPE_RANK_WEIGHTS)
+ACTIVITY_SOURCES = (
+    (Favorite, 'favorite'),
+    (ShoppingCart, 'shopping_cart'),
+)
+
+
+def create_ranks(recipe_ids):
+    """
+    Создает нулевые рейтинги рецептов: у каждого рецепта есть строка
+    рейтинга, сортировка по рейтингу соединяет таблицы без LEFT JOIN
+    """
+    RecipeRank.objects.bulk_create(
+        (RecipeRank(recipe_id=recipe_id) for recipe_id in recipe_ids),
+        ignore_conflicts=True,
+    )
+
+
+def reset_ranks():
+    """Обнуляет рейтинги и создает недостающие строки рейтинга"""
+    RecipeRank.objects.exclude(popular_score=0, trending_score=0).update(
+        popular_score=0, trending_score=0
+    )
+    create_ranks(Recipe.objects.filter(rank__isnull=True).values_list(
+        'pk', flat=True
+    ).iterator())
+
+
+def decay(age):
+    """Множитель затухания вклада добавления возраста age (timedelta)"""
+    return 0.5 ** (age / settings.RECIPE_TRENDING_HALF_LIFE)
+
+
+def collect_activity(since, until):
+    """
+    Вклад добавлений в избранное и в списки покупок за период
+    (since, until] в рейтинг рецептов, since=None - за все время
+    Возвращает словари {id рецепта: вклад} для popular и trending
+    """
+    popular, trending = defaultdict(float), defaultdict(float)
+    for model, weight_key in ACTIVITY_SOURCES:
+        weight = settings.RECIPE_RANK_WEIGHTS[weight_key]
+        activity = model.objects.filter(created__lte=until)
+        if since is not None:
+            activity = activity.filter(created__gt=since)
+        for recipe_id, created in activity.order_by().values_list(
+            'recipe_id', 'created'
+        ).iterator():
+            popular[recipe_id] += weight
+            trending[recipe_id] += weight * decay(until - created)
+    return popular, trending
+
+
+def decay_trending(factor):
+    """Уменьшает все trending-рейтинги одним запросом"""
+    ranks = RecipeRank.objects.filter(trending_score__gt=0)
+    ranks.update(trending_score=F('trending_score') * factor)
+    ranks.filter(trending_score__lt=MIN_TRENDING_SCORE).update(
+        trending_score=0
+    )
+
+
+def apply_activity(popular, trending):
+    """Добавляет вклад новых добавлений к рейтингам рецептов"""
+    ranks = RecipeRank.objects.in_bulk(list(popular))
+    for recipe_id, rank in ranks.items():
+        rank.popular_score += popular[recipe_id]
+        rank.trending_score += trending[recipe_id]
+    RecipeRank.objects.bulk_update(
+        ranks.values(), ('popular_score', 'trending_score'),
+        batch_size=BATCH_SIZE,
+    )
+    RecipeRank.objects.bulk_create(
+        (
+            RecipeRank(
+                recipe_id=recipe_id,
+                popular_score=score,
+                trending_score=trending[recipe_id],
+            )
+            for recipe_id, score in popular.items()
+            if recipe_id not in ranks
+        ),
+    )
+
+
+@transaction.atomic
+def recompute_ranks(full=False, now=None):
+    """
+    Пересчитывает рейтинг рецептов
+    Пересчет инкрементальный: trending-рейтинги уменьшаются
+    на затухание за время с прошлого пересчета, и к рейтингам добавляется
+    вклад только новых добавлений. Удаления из избранного и списков
+    покупок учитываются при полном пересчете (full=True)
+    Добавления последних RECIPE_RANK_LAG секунд откладываются
+    до следующего пересчета, чтобы не пропустить еще не зафиксированные
+    транзакции
+    Возвращает количество рецептов с новыми добавлениями
+    """
+    until = (now or timezone.now()) - settings.RECIPE_RANK_LAG
+    checkpoint = RankCheckpoint.objects.select_for_update().filter(
+        pk=CHECKPOINT_ID
+    ).first()
+    since = None if full or checkpoint is None else checkpoint.computed_until
+    if since is None:
+        reset_ranks()
+    elif until <= since:
+        return 0
+    else:
+        decay_trending(decay(until - since))
+    popular, trending = collect_activity(since, until)
+    apply_activity(popular, trending)
+    RankCheckpoint.objects.update_or_create(
+        pk=CHECKPOINT_ID, defaults={'computed_until': until}
+    )
+    return len(popular)
@@ -0,0 +1,270 @@
+import json
+import mimetypes
+from base64 import b64encode
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Prefetch, Q
+
+from api.counters import change_counter
+from api.feed import fan_out
+from api.image_tasks import image_queue
+from api.models import CountOfIngredient, Ingredient, Recipe, Tag
+from api.ranking import create_ranks
+from api.serializers import (
+    INGREDIENT_DOES_NOT_EXIST,
+    INGREDIENTS_UNIQUE_ERROR,
+    TAG_DOES_NOT_EXIST,
+    TAGS_UNIQUE_ERROR,
+    RecipeImportSerializer
+)
+
+User = get_user_model()
+
+RECIPES_FILENAME = 'recipes.ndjson'
+IMAGE_FORMATS = ('base64', 'url')
+DEFAULT_IMAGE_TYPE = 'image/png'
+
+
+def chunked(items, size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingredient_key(ingredient):
+    if 'id' in ingredient:
+        return ingredient['id']
+    return ingredient['name'], ingredient['measurement_unit']
+
+
+def tag_ids(items):
+    """{id или slug: id тега} для всех тегов пачки одним запросом"""
+    keys = {key for item in items for key in item['tags']}
+    ids = {key for key in keys if isinstance(key, int)}
+    slugs = keys - ids
+    found = {}
+    for pk, slug in Tag.objects.filter(
+        Q(pk__in=ids) | Q(slug__in=slugs)
+    ).values_list('pk', 'slug'):
+        if pk in ids:
+            found[pk] = pk
+        if slug in slugs:
+            found[slug] = pk
+    return found
+
+
+def ingredient_ids(items):
+    """
+    {id или (name, measurement_unit): id ингредиента}
+    для всех ингредиентов пачки одним запросом
+    """
+    keys = {
+        ingredient_key(ingredient)
+        for item in items for ingredient in item['ingredients']
+    }
+    ids = {key for key in keys if isinstance(key, int)}
+    names = {name for name, _ in keys - ids}
+    found = {}
+    for pk, name, measurement_unit in Ingredient.objects.filter(
+        Q(pk__in=ids) | Q(name__in=names)
+    ).order_by('-pk').values_list('pk', 'name', 'measurement_unit'):
+        if pk in ids:
+            found[pk] = pk
+        if (name, measurement_unit) in keys:
+            found[name, measurement_unit] = pk
+    return found
+
+
+def resolve(item, tags, ingredients):
+    """
+    Заменяет ключи тегов и ингредиентов рецепта на id
+    Возвращает ошибки или None
+    """
+    item_tags = [tags.get(key) for key in item['tags']]
+    if None in item_tags:
+        return {'tags': [TAG_DOES_NOT_EXIST]}
+    if len(set(item_tags)) < len(item_tags):
+        return {'tags': [TAGS_UNIQUE_ERROR]}
+    amounts = {}
+    for ingredient in item['ingredients']:
+        pk = ingredients.get(ingredient_key(ingredient))
+        if pk is None:
+            return {'ingredients': [INGREDIENT_DOES_NOT_EXIST]}
+        if pk in amounts:
+            return {'ingredients': [INGREDIENTS_UNIQUE_ERROR]}
+        amounts[pk] = ingredient['amount']
+    item['tags'], item['ingredients'] = item_tags, amounts
+    return None
+
+
+@transaction.atomic
+def save_recipes(items, author):
+    """
+    Сохраняет пачку рецептов: рецепты, ингредиенты и теги
+    вставляются пакетно, изображения обрабатываются после фиксации
+    """
+    recipes = [
+        Recipe(
+            author=author,
+            name=item['name'],
+            text=item['text'],
+            cooking_time=item['cooking_time'],
+            image=item['image'],
+            image_status=Recipe.IMAGE_PENDING,
+        )
+        for item in items
+    ]
+    if connection.features.can_return_ids_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        change_counter(User, author.pk, 'recipes_count', len(recipes))
+        create_ranks([recipe.pk for recipe in recipes])
+        fan_out(recipes)
+    else:
+        for recipe in recipes:
+            recipe.save()
+    CountOfIngredient.objects.bulk_create(
+        CountOfIngredient(recipe=recipe, ingredient_id=pk, amount=amount)
+        for recipe, item in zip(recipes, items)
+        for pk, amount in item['ingredients'].items()
+    )
+    RecipeTag = Recipe.tags.through
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag_id=tag_id)
+        for recipe, item in zip(recipes, items)
+        for tag_id in item['tags']
+    )
+    for recipe in recipes:
+        image_queue.schedule(recipe)
+    return recipes
+
+
+def validate_chunk(chunk):
+    """Проверяет поля рецептов пачки, возвращает (ошибки, рецепты)"""
+    results, valid = [], []
+    for number, data, error in chunk:
+        if error is not None:
+            results.append({
+                'line': number, 'errors': {'non_field_errors': [error]}
+            })
+            continue
+        serializer = RecipeImportSerializer(data=data)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            results.append({'line': number, 'errors': serializer.errors})
+    return results, valid
+
+
+def import_chunk(chunk, author):
+    results, valid = validate_chunk(chunk)
+    tags = tag_ids(item for _, item in valid)
+    ingredients = ingredient_ids(item for _, item in valid)
+    numbers, items = [], []
+    for number, item in valid:
+        errors = resolve(item, tags, ingredients)
+        if errors:
+            results.append({'line': number, 'errors': errors})
+        else:
+            numbers.append(number)
+            items.append(item)
+    if items:
+        results.extend(
+            {'line': number, 'id': recipe.pk}
+            for number, recipe in zip(numbers, save_recipes(items, author))
+        )
+    return sorted(results, key=itemgetter('line'))
+
+
+def import_recipes(records, author, chunk_size=None):
+    """
+    Пакетный импорт рецептов от имени author
+    records - тройки (номер строки, объект, ошибка) из parse_ndjson
+    Рецепты проверяются и сохраняются пачками по chunk_size:
+    на пачку - один запрос тегов, один запрос ингредиентов
+    и одна транзакция
+    Возвращает результаты по строкам: {'line', 'id'} или {'line', 'errors'}
+    """
+    for chunk in chunked(
+        records, chunk_size or settings.RECIPE_BATCH_CHUNK_SIZE
+    ):
+        yield from import_chunk(chunk, author)
+
+
+def export_image(file, images, request=None):
+    """
+    Ссылка на изображение или само изображение в base64
+    Если файла нет в хранилище, изображение не выгружается
+    """
+    if not file:
+        return None
+    if images == 'base64':
+        content_type = mimetypes.guess_type(file.name)[0]
+        try:
+            with default_storage.open(file.name, 'rb') as image:
+                content = b64encode(image.read()).decode()
+        except OSError:
+            return None
+        return f'data:{content_type or DEFAULT_IMAGE_TYPE};base64,{content}'
+    if request is None:
+        return file.url
+    return request.build_absolute_uri(file.url)
+
+
+def export_item(recipe, images, request=None):
+    """
+    Рецепт в формате импорта: теги - slug, ингредиенты - название
+    и единица измерения, чтобы не зависеть от id в другой базе
+    """
+    return {
+        'id': recipe.pk,
+        'author': recipe.author.username if recipe.author else None,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': export_image(recipe.image, images, request),
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': amount.ingredient.name,
+                'measurement_unit': amount.ingredient.measurement_unit,
+                'amount': amount.amount,
+            }
+            for amount in recipe.ingredient_amounts.all()
+        ],
+    }
+
+
+def export_recipes(images='base64', request=None, chunk_size=None):
+    """
+    Выгружает все рецепты в NDJSON, по строке на рецепт
+    Рецепты читаются пачками по id, связанные объекты загружаются
+    одним запросом на пачку
+    """
+    chunk_size = chunk_size or settings.RECIPE_BATCH_CHUNK_SIZE
+    recipes = Recipe.objects.order_by('pk').select_related(
+        'author'
+    ).prefetch_related(
+        'tags',
+        Prefetch(
+            'ingredient_amounts',
+            CountOfIngredient.objects.select_related('ingredient'),
+        ),
+    )
+    last_pk = 0
+    while True:
+        chunk = list(recipes.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        for recipe in chunk:
+            yield json.dumps(
+                export_item(recipe, images, request), ensure_ascii=False
+            ) + '\n'
+        last_pk = chunk[-1].pk
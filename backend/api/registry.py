@@ -0,0 +1,150 @@
+from collections import defaultdict
+from threading import Lock
+
+from api.caching import namespaced_cache
+from api.models import CountOfIngredient, Ingredient, Recipe, Tag
+
+
+class TagRecord:
+    """Тег в справочнике"""
+    __slots__ = ('id', 'name', 'color', 'slug')
+
+    def __init__(self, id, name, color, slug):
+        self.id = id
+        self.name = name
+        self.color = color
+        self.slug = slug
+
+
+class IngredientRecord:
+    """Ингредиент в справочнике"""
+    __slots__ = ('id', 'name', 'measurement_unit')
+
+    def __init__(self, id, name, measurement_unit):
+        self.id = id
+        self.name = name
+        self.measurement_unit = measurement_unit
+
+
+class IngredientAmount:
+    """Ингредиент рецепта с количеством"""
+    __slots__ = ('id', 'name', 'measurement_unit', 'amount')
+
+    def __init__(self, ingredient, amount):
+        self.id = ingredient.id
+        self.name = ingredient.name
+        self.measurement_unit = ingredient.measurement_unit
+        self.amount = amount
+
+
+class ReferenceRegistry:
+    """
+    Справочник в памяти процесса: все записи небольшой, редко меняющейся
+    таблицы по id
+    Справочник строится при первом обращении и перестраивается, когда
+    меняется версия пространства имен модели в общем кэше, то есть после
+    изменения данных в любом процессе
+    Ключевые аргументы:
+    namespace -- пространство имен модели в общем кэше,
+    model -- модель справочника,
+    record_class -- класс записи, его __slots__ - поля модели
+    """
+
+    def __init__(self, namespace, model, record_class):
+        self.namespace = namespace
+        self.model = model
+        self.record_class = record_class
+        self._lock = Lock()
+        self._records = None
+        self._version = None
+
+    def load(self, ids=None):
+        rows = self.model.objects.order_by('pk')
+        if ids is not None:
+            rows = rows.filter(pk__in=ids)
+        return {
+            row[0]: self.record_class(*row)
+            for row in rows.values_list(*self.record_class.__slots__)
+        }
+
+    def records(self):
+        """Все записи справочника: {id: запись}"""
+        version = namespaced_cache.version(self.namespace)
+        records = self._records
+        if records is None or self._version != version:
+            with self._lock:
+                records = self._records
+                if records is None or self._version != version:
+                    records = self._records = self.load()
+                    self._version = version
+        return records
+
+    def get_many(self, ids):
+        """
+        Записи по id: {id: запись}, несуществующих id в результате нет
+        Записи, которых еще нет в справочнике (изменение в другом
+        процессе до увеличения версии), читаются из базы данных
+        """
+        records = self.records()
+        found = {pk: records[pk] for pk in ids if pk in records}
+        missing = set(ids) - found.keys()
+        if missing:
+            found.update(self.load(missing))
+        return found
+
+
+tag_registry = ReferenceRegistry('tag', Tag, TagRecord)
+ingredient_registry = ReferenceRegistry(
+    'ingredient', Ingredient, IngredientRecord
+)
+
+
+def recipe_references(recipe_ids):
+    """
+    Теги и ингредиенты с количеством рецептов из справочников:
+    из базы данных читаются только id связей, без соединения
+    с таблицами тегов и ингредиентов
+    Возвращает словари {id рецепта: [TagRecord]}
+    и {id рецепта: [IngredientAmount]}
+    """
+    tag_ids = defaultdict(list)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag_id').values_list('recipe_id', 'tag_id'):
+        tag_ids[recipe_id].append(tag_id)
+    amounts = defaultdict(list)
+    for recipe_id, ingredient_id, amount in CountOfIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('pk').values_list('recipe_id', 'ingredient_id', 'amount'):
+        amounts[recipe_id].append((ingredient_id, amount))
+    tags = tag_registry.get_many(
+        {pk for ids in tag_ids.values() for pk in ids}
+    )
+    ingredients = ingredient_registry.get_many({
+        pk for recipe_amounts in amounts.values() for pk, _ in recipe_amounts
+    })
+    recipe_tags = {
+        recipe_id: [tags[pk] for pk in ids if pk in tags]
+        for recipe_id, ids in tag_ids.items()
+    }
+    recipe_ingredients = {
+        recipe_id: [
+            IngredientAmount(ingredients[pk], amount)
+            for pk, amount in recipe_amounts if pk in ingredients
+        ]
+        for recipe_id, recipe_amounts in amounts.items()
+    }
+    return recipe_tags, recipe_ingredients
+
+
+def attach_references(recipes):
+    """
+    Добавляет рецептам теги ('tag_records') и ингредиенты с количеством
+    ('ingredient_records') из справочников
+    """
+    recipe_tags, recipe_ingredients = recipe_references(
+        [recipe.pk for recipe in recipes]
+    )
+    for recipe in recipes:
+        recipe.tag_records = recipe_tags.get(recipe.pk, [])
+        recipe.ingredient_records = recipe_ingredients.get(recipe.pk, [])
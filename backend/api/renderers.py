@@ -0,0 +1,91 @@
+import re
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None else None
+)
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+# orjson пишет показатель степени числа как 1e16 и 1e-6, json - как
+# 1e+16 и 1e-06; строки пропускаются целиком, чтобы не менять их текст
+EXPONENT = re.compile(rb'[0-9]e-?[0-9]')
+STRING_OR_EXPONENT = re.compile(
+    rb'"(?:[^"\\]|\\.)*"|(?<=[0-9])e(-?)([0-9]+)'
+)
+
+
+def python_exponent(match):
+    """Показатель степени в записи json.dumps, строки - без изменений"""
+    if match.group(2) is None:
+        return match.group(0)
+    return b'e' + (match.group(1) or b'+') + match.group(2).zfill(2)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson; без установленного orjson, для ответов
+    с отступами (browsable API, '; indent=') и при отключенных
+    UNICODE_JSON или COMPACT_JSON работает стандартный рендерер
+    Типы, которых нет в JSON (Decimal, datetime, ленивые строки перевода
+    и т.д.), преобразуются кодировщиком DRF, поэтому ответ не отличается
+    от ответа JSONRenderer
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(
+            accepted_media_type or '', renderer_context or {}
+        )
+        if orjson is None or indent or self.ensure_ascii or not self.compact:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            content = orjson.dumps(
+                data, default=JSONEncoder().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            # целые больше 64 бит и другие значения, которые orjson
+            # не сериализует
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        if EXPONENT.search(content):
+            content = STRING_OR_EXPONENT.sub(python_exponent, content)
+        return content
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """
+    Рендерер для выбора формата списка покупок
+    Сам файл отдается потоком, рендерер используется только
+    для сообщений об ошибках
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return FastJSONRenderer().render(data)
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+
+from api.registry import recipe_references
+
+User = get_user_model()
+
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def tag_representation(tag):
+    return {
+        'id': tag.id,
+        'name': tag.name,
+        'color': tag.color,
+        'slug': tag.slug,
+    }
+
+
+def ingredient_representation(ingredient):
+    return {
+        'id': ingredient.id,
+        'name': ingredient.name,
+        'measurement_unit': ingredient.measurement_unit,
+        'amount': ingredient.amount,
+    }
+
+
+def image_url(recipe, rendition):
+    """Относительная ссылка на изображение, как в RecipeImageField"""
+    file = rendition and getattr(recipe, rendition) or recipe.image
+    return file.url if file else None
+
+
+def build_recipe_fragments(recipes, rendition=None):
+    """
+    Фрагменты рецептов (см. RecipeFragmentSerializer) без полей
+    и сериализаторов DRF: авторы читаются через .values(), теги
+    и ингредиенты - из справочников; результат совпадает
+    с RecipeFragmentSerializer
+    Возвращает словарь {id рецепта: фрагмент}
+    """
+    authors = {
+        author['id']: author
+        for author in User.objects.filter(
+            pk__in={recipe.author_id for recipe in recipes}
+        ).values(*AUTHOR_FIELDS)
+    }
+    recipe_tags, recipe_ingredients = recipe_references(
+        [recipe.pk for recipe in recipes]
+    )
+    return {
+        recipe.pk: {
+            'id': recipe.pk,
+            'name': recipe.name,
+            'tags': [
+                tag_representation(tag)
+                for tag in recipe_tags.get(recipe.pk, ())
+            ],
+            'author': authors.get(recipe.author_id),
+            'ingredients': [
+                ingredient_representation(ingredient)
+                for ingredient in recipe_ingredients.get(recipe.pk, ())
+            ],
+            'image': image_url(recipe, rendition),
+            'image_status': recipe.image_status,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+        for recipe in recipes
+    }
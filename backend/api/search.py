@@ -0,0 +1,103 @@
+from bisect import bisect_left
+from threading import Lock
+
+from api.caching import namespaced_cache
+from api.registry import ingredient_registry
+
+TRIGRAM_SIZE = 3
+
+
+def trigrams(value):
+    return {
+        value[i:i + TRIGRAM_SIZE]
+        for i in range(len(value) - TRIGRAM_SIZE + 1)
+    }
+
+
+class IngredientSearchIndex:
+    """
+    Поисковый индекс ингредиентов в памяти процесса
+    Ключевые аргументы:
+    keys -- названия в нижнем регистре, отсортированные по алфавиту,
+    entries -- записи справочника ингредиентов в том же порядке,
+    postings -- позиции в keys для каждой триграммы названия
+    Индекс строится при первом поиске и перестраивается, когда
+    меняется версия пространства имен 'ingredient' в общем кэше,
+    то есть после изменения ингредиентов в любом процессе
+    """
+    namespace = 'ingredient'
+
+    def __init__(self):
+        self._lock = Lock()
+        self._state = None
+        self._version = None
+
+    def build(self):
+        entries = sorted(
+            ingredient_registry.records().values(),
+            key=lambda entry: (entry.name.lower(), entry.id)
+        )
+        keys = [entry.name.lower() for entry in entries]
+        postings = {}
+        for position, key in enumerate(keys):
+            for trigram in trigrams(key):
+                postings.setdefault(trigram, []).append(position)
+        return keys, entries, postings
+
+    def get_state(self):
+        version = namespaced_cache.version(self.namespace)
+        state = self._state
+        if state is None or self._version != version:
+            with self._lock:
+                state = self._state
+                if state is None or self._version != version:
+                    state = self._state = self.build()
+                    self._version = version
+        return state
+
+    def search(self, value, limit=None):
+        """
+        Возвращает ингредиенты, название которых начинается с value,
+        затем ингредиенты, название которых содержит value
+        """
+        keys, entries, postings = self.get_state()
+        value = value.lower()
+        start = bisect_left(keys, value)
+        end = start
+        while end < len(keys) and keys[end].startswith(value):
+            end += 1
+        result = entries[start:end]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        for position in self.contain_positions(value, keys, postings):
+            if start <= position < end:
+                continue
+            result.append(entries[position])
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    @staticmethod
+    def contain_positions(value, keys, postings):
+        if len(value) < TRIGRAM_SIZE:
+            candidates = range(len(keys))
+        else:
+            candidate_set = None
+            for trigram in sorted(
+                trigrams(value), key=lambda key: len(postings.get(key, ()))
+            ):
+                positions = postings.get(trigram)
+                if positions is None:
+                    return []
+                candidate_set = (
+                    set(positions) if candidate_set is None
+                    else candidate_set.intersection(positions)
+                )
+            candidates = sorted(candidate_set)
+        return [
+            position for position in candidates
+            if value in keys[position]
+        ]
+
+
+ingredient_index = IngredientSearchIndex()
@@ -1,25 +1,49 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
-from drf_extra_fields.fields import Base64ImageField
 
+from api.fields import Base64ImageUploadField, RecipeImageField
+from api.fragments import recipe_fragments
+from api.image_tasks import image_queue
+from api.registry import attach_references, ingredient_registry, tag_registry
+from api.representations import build_recipe_fragments
 from api.models import (
     CountOfIngredient,
     Favorite,
     Ingredient,
     Recipe,
     ShoppingCart,
+    ShoppingCartIngredient,
     Tag
 )
+from users.models import Follow
 from users.serializers import UserDetailSerializer
 
 
 TAGS_UNIQUE_ERROR = 'Теги не могут повторяться!'
+TAG_DOES_NOT_EXIST = 'Тега не существует!'
+TAG_KEY_ERROR = 'Тег задается id или slug!'
+INGREDIENT_KEY_REQUIRED = (
+    'Ингредиент задается id или парой name и measurement_unit!'
+)
 INGREDIENTS_UNIQUE_ERROR = 'Ингредиенты не могут повторяться!'
 INGREDIENT_DOES_NOT_EXIST = 'Ингредиента не существует!'
 INGREDIENT_MIN_AMOUNT_ERROR = (
     'Количество ингредиента не может быть меньше {min_value}!'
 )
 INGREDIENT_MIN_AMOUNT = 1
+RECIPE_FIELDS = (
+    'id', 'name', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'image', 'image_status', 'text', 'cooking_time',
+)
+RECIPE_UPDATE_FIELDS = ('name', 'text', 'cooking_time', 'updated_at')
+RECIPE_IMAGE_FIELDS = (
+    'image', 'thumbnail', 'small_thumbnail', 'image_status',
+)
 
 
 class IngredientsSerializer(serializers.ModelSerializer):
@@ -70,46 +94,132 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
         }
 
 
-class RecipeIngredientReadSerializer(serializers.ModelSerializer):
+class RecipeIngredientReadSerializer(serializers.Serializer):
     """
     Сериализатор для получения данных об ингредиентах, применяемых в рецепте
+    Данные берутся из справочника ингредиентов (api.registry)
     """
-    name = serializers.ReadOnlyField(source='ingredient.name')
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit.name'
-    )
-    id = serializers.ReadOnlyField(source='ingredient.id')
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    measurement_unit = serializers.CharField(read_only=True)
+    amount = serializers.IntegerField(read_only=True)
 
-    class Meta:
-        model = CountOfIngredient
-        fields = [
-            'id',
-            'name',
-            'measurement_unit',
-            'amount'
-        ]
+
+class RecipeAuthorSerializer(UserDetailSerializer):
+    """
+    Автор рецепта без поля 'is_subscribed': применяется во фрагментах
+    RecipeFragmentSerializer, подписка добавляется при ответе
+    """
+
+    class Meta(UserDetailSerializer.Meta):
+        fields = ('email', 'id', 'username', 'first_name', 'last_name',)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeFragmentSerializer(serializers.ModelSerializer):
     """
-    Сериализатор для чтения рецептов
+    Не зависящая от пользователя часть представления рецепта,
+    хранится в кэше фрагментов (api.fragments)
+    Ссылка на изображение относительная, она дополняется при ответе
+    Теги и ингредиенты берутся из справочников (api.registry)
     """
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
-    tags = TagSerializer(many=True)
-    author = UserDetailSerializer()
+    tags = TagSerializer(source='tag_records', many=True)
+    author = RecipeAuthorSerializer()
     ingredients = RecipeIngredientReadSerializer(
-        source='ingredient_amounts',
+        source='ingredient_records',
         many=True)
+    image = RecipeImageField()
 
     class Meta:
         model = Recipe
         fields = (
-            'id', 'name', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'image', 'text', 'cooking_time',
+            'id', 'name', 'tags', 'author', 'ingredients', 'image',
+            'image_status', 'text', 'cooking_time',
         )
 
+
+def serialize_fragments(recipes, rendition=None):
+    """Фрагменты рецептов RecipeFragmentSerializer: {id рецепта: фрагмент}"""
+    prefetch_related_objects(recipes, 'author')
+    attach_references(recipes)
+    serializer = RecipeFragmentSerializer(
+        recipes, many=True, context={'image_rendition': rendition}
+    )
+    return {fragment['id']: dict(fragment) for fragment in serializer.data}
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """
+    Список рецептов: фрагменты всей страницы читаются из кэша вместе
+    """
+
+    def to_representation(self, data):
+        recipes = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        return self.child.represent(recipes)
+
+
+class RecipeReadSerializer(serializers.Serializer):
+    """
+    Сериализатор для чтения рецептов
+    Общая часть представления берется из кэша фрагментов, поля,
+    зависящие от пользователя ('is_favorited', 'is_in_shopping_cart',
+    'author.is_subscribed'), добавляются при каждом ответе
+    Поля DRF не объявляются: представление собирается в represent,
+    поля и их порядок - RECIPE_FIELDS
+    """
+
+    class Meta:
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent([instance])[0]
+
+    def represent(self, recipes):
+        rendition = self.context.get('image_rendition')
+        fragments = recipe_fragments.get_or_build(
+            recipes,
+            rendition or 'image',
+            partial(self.build_fragments, rendition=rendition),
+        )
+        return [self.merge(recipe, fragments[recipe.pk]) for recipe in recipes]
+
+    def build_fragments(self, recipes, rendition):
+        """
+        При RECIPE_FAST_REPRESENTATION фрагменты строятся без
+        сериализаторов DRF (api.representations), иначе -
+        RecipeFragmentSerializer
+        """
+        if settings.RECIPE_FAST_REPRESENTATION:
+            return build_recipe_fragments(recipes, rendition)
+        return serialize_fragments(recipes, rendition)
+
+    def merge(self, recipe, fragment):
+        data = dict(fragment)
+        if data['author'] is not None:
+            data['author'] = dict(
+                data['author'], is_subscribed=self.get_is_subscribed(recipe)
+            )
+        request = self.context.get('request')
+        if data['image'] and request is not None:
+            data['image'] = request.build_absolute_uri(data['image'])
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        return {field: data[field] for field in RECIPE_FIELDS}
+
+    def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_author_subscribed'):
+            return obj.is_author_subscribed
+        request = self.context.get('request')
+        if request is None or request.user.is_anonymous:
+            return False
+        return Follow.objects.filter(
+            user=request.user, author_id=obj.author_id
+        ).exists()
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -117,6 +227,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         return Favorite.objects.filter(user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -129,10 +241,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
     Сериализатор для записи рецептов
     """
     ingredients = RecipeIngredientWriteSerializer(many=True)
-    tags = serializers.ListField(
-        child=serializers.SlugRelatedField(
-            slug_field='id', queryset=Tag.objects.all(),),)
-    image = Base64ImageField()
+    tags = serializers.ListField(child=serializers.IntegerField())
+    image = Base64ImageUploadField()
 
     class Meta:
         model = Recipe
@@ -145,71 +255,217 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'cooking_time',)
 
     def validate(self, attrs):
-        if len(attrs['tags']) > len(set(attrs['tags'])):
+        """
+        Проверяет повторы и существование тегов и ингредиентов
+        по справочникам в памяти, без запросов к базе данных
+        """
+        tags = attrs.get('tags', [])
+        if len(tags) > len(set(tags)):
             raise serializers.ValidationError(TAGS_UNIQUE_ERROR)
-        id_ingredients = []
-        for ingredient in attrs['ingredients']:
-            id_ingredients.append(ingredient['id'])
+        id_ingredients = [
+            ingredient['id'] for ingredient in attrs.get('ingredients', [])
+        ]
         if len(id_ingredients) > len(set(id_ingredients)):
             raise serializers.ValidationError(INGREDIENTS_UNIQUE_ERROR)
+        if len(tag_registry.get_many(tags)) < len(tags):
+            raise serializers.ValidationError(TAG_DOES_NOT_EXIST)
+        if len(ingredient_registry.get_many(id_ingredients)) < len(
+            id_ingredients
+        ):
+            raise serializers.ValidationError(INGREDIENT_DOES_NOT_EXIST)
         return attrs
 
     def add_ingredients_and_tags(self, instance, validated_data):
         ingredients, tags = (
             validated_data.pop('ingredients'), validated_data.pop('tags')
         )
-        new_ingredients = [
+        CountOfIngredient.objects.bulk_create(
             CountOfIngredient(
-                ingredient=get_object_or_404(Ingredient, pk=ingredient['id']),
+                ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
                 recipe=instance
             )
             for ingredient in ingredients
-        ]
-        CountOfIngredient.objects.bulk_create(new_ingredients)
-        for tag in tags:
-            instance.tags.add(tag)
+        )
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=instance, tag_id=tag_id) for tag_id in tags
+        )
         return instance
 
+    def update_tags(self, instance, tags):
+        """Удаляет и добавляет только изменившиеся теги"""
+        RecipeTag = Recipe.tags.through
+        current = set(RecipeTag.objects.filter(
+            recipe=instance
+        ).values_list('tag_id', flat=True))
+        removed = current - set(tags)
+        if removed:
+            RecipeTag.objects.filter(
+                recipe=instance, tag_id__in=removed
+            ).delete()
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=instance, tag_id=tag_id)
+            for tag_id in tags if tag_id not in current
+        )
+
+    def update_ingredients(self, instance, ingredients):
+        """
+        Сравнивает новые ингредиенты с сохраненными и добавляет,
+        изменяет и удаляет только изменившиеся строки
+        Изменение переносится в списки покупок
+        """
+        current = {
+            ingredient_id: (pk, amount)
+            for pk, ingredient_id, amount in CountOfIngredient.objects.filter(
+                recipe=instance
+            ).values_list('pk', 'ingredient_id', 'amount')
+        }
+        new_amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        created, changed = [], []
+        for ingredient_id, amount in new_amounts.items():
+            if ingredient_id not in current:
+                created.append(CountOfIngredient(
+                    recipe=instance,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                ))
+            elif current[ingredient_id][1] != amount:
+                changed.append(CountOfIngredient(
+                    pk=current[ingredient_id][0], amount=amount
+                ))
+        removed = [
+            pk for ingredient_id, (pk, _) in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        if removed:
+            CountOfIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            CountOfIngredient.objects.bulk_update(changed, ['amount'])
+        CountOfIngredient.objects.bulk_create(created)
+        ShoppingCartIngredient.objects.change_recipe_amounts(
+            instance,
+            {
+                ingredient_id: amount
+                for ingredient_id, (_, amount) in current.items()
+            },
+            new_amounts,
+        )
+
     def to_representation(self, instance):
+        """
+        Рецепт перечитывается с теми же флагами пользователя и
+        временем изменения, что и в списке
+        """
+        instance = Recipe.objects.with_user_flags(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context=self.context).data
 
+    @transaction.atomic
     def create(self, validated_data):
         saved = {}
         saved['ingredients'] = validated_data.pop('ingredients')
         saved['tags'] = validated_data.pop('tags')
         recipe = Recipe.objects.create(
             author=self.context.get('request').user,
+            image_status=Recipe.IMAGE_PENDING,
             **validated_data)
+        image_queue.schedule(recipe)
         return self.add_ingredients_and_tags(recipe, saved)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        context = self.context['request']
-        tags_set = context.data['tags']
-        recipe = instance
+        """
+        Записываются только поля из запроса и 'updated_at':
+        счетчики, рассылка в ленты и результат обработки изображения
+        изменяются в базе данных отдельно, в instance они могут быть
+        устаревшими
+        """
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time)
-        instance.image = validated_data.get('image', instance.image)
-        instance.save()
-        instance.tags.set(tags_set)
-        CountOfIngredient.objects.filter(recipe=instance).delete()
-        ingredients = context.data['ingredients']
-        for ingredient in ingredients:
-            ingredient_model = Ingredient.objects.get(id=ingredient['id'])
-            CountOfIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient_model,
-                amount=ingredient['amount'],
-            )
+        update_fields = list(RECIPE_UPDATE_FIELDS)
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            instance.thumbnail = instance.small_thumbnail = ''
+            instance.image_status = Recipe.IMAGE_PENDING
+            update_fields.extend(RECIPE_IMAGE_FIELDS)
+        instance.save(update_fields=update_fields)
+        if 'image' in validated_data:
+            image_queue.schedule(instance)
+        if 'tags' in validated_data:
+            self.update_tags(instance, validated_data['tags'])
+        if 'ingredients' in validated_data:
+            self.update_ingredients(instance, validated_data['ingredients'])
         return instance
 
 
+class TagKeyField(serializers.Field):
+    """Тег при пакетном импорте: id (число) или slug (строка)"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)):
+            raise serializers.ValidationError(TAG_KEY_ERROR)
+        return data
+
+
+class RecipeImportIngredientSerializer(serializers.Serializer):
+    """
+    Ингредиент при пакетном импорте: id или пара name и measurement_unit,
+    чтобы рецепты переносились между базами с разными id
+    """
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(required=False)
+    measurement_unit = serializers.CharField(required=False)
+    amount = serializers.IntegerField(
+        min_value=INGREDIENT_MIN_AMOUNT,
+        error_messages={
+            'min_value': INGREDIENT_MIN_AMOUNT_ERROR.format(
+                min_value=INGREDIENT_MIN_AMOUNT
+            ),
+        },
+    )
+
+    def validate(self, attrs):
+        if 'id' not in attrs and not (
+            'name' in attrs and 'measurement_unit' in attrs
+        ):
+            raise serializers.ValidationError(INGREDIENT_KEY_REQUIRED)
+        return attrs
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор рецепта при пакетном импорте
+    Проверяет только сами поля, существование тегов и ингредиентов
+    проверяется одним запросом на пачку рецептов (api.recipe_batch)
+    """
+    ingredients = RecipeImportIngredientSerializer(many=True)
+    tags = serializers.ListField(child=TagKeyField())
+    image = Base64ImageUploadField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'ingredients',
+            'tags',
+            'image',
+            'name',
+            'text',
+            'cooking_time',)
+
+
 class RecipeFollowSerializer(serializers.ModelSerializer):
     """
     Сериализатор для получения данных о рецепте
     """
+    image = RecipeImageField(rendition='small_thumbnail')
+
     class Meta:
         model = Recipe
         fields = (
@@ -0,0 +1,109 @@
+import csv
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import F, Sum
+
+from api.models import ShoppingCart, ShoppingCartIngredient
+
+SHOPPING_CART_FILENAME = 'shopping_cart.{extension}'
+SHOPPING_CART_LINE = '{name} - {amount} {measurement_unit}\n'
+
+
+def shopping_cart_rows(user):
+    """
+    Суммарное количество ингредиентов из рецептов в списке покупок
+    пользователя, упорядоченное по единице измерения и названию
+    Суммы заранее посчитаны в ShoppingCartIngredient
+    """
+    return ShoppingCartIngredient.objects.filter(user=user).values(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        amount=F('total_amount'),
+    ).order_by(
+        'measurement_unit', 'name'
+    ).iterator()
+
+
+def expected_shopping_cart_totals(user_ids=None):
+    """
+    Пересчитывает суммы ингредиентов в списках покупок по рецептам
+    Возвращает словарь {(id пользователя, id ингредиента): количество}
+    """
+    shopping_carts = ShoppingCart.objects.filter(
+        recipe__ingredient_amounts__isnull=False
+    )
+    if user_ids is not None:
+        shopping_carts = shopping_carts.filter(user_id__in=user_ids)
+    totals = shopping_carts.values(
+        'user_id', ingredient_id=F('recipe__ingredient_amounts__ingredient')
+    ).annotate(
+        total_amount=Sum('recipe__ingredient_amounts__amount')
+    ).order_by()
+    return {
+        (total['user_id'], total['ingredient_id']): total['total_amount']
+        for total in totals.iterator()
+    }
+
+
+def stored_shopping_cart_totals(user_ids=None):
+    totals = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        totals = totals.filter(user_id__in=user_ids)
+    return {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in totals.values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator()
+    }
+
+
+def group_by_unit(rows):
+    return groupby(rows, key=itemgetter('measurement_unit'))
+
+
+def export_txt(rows):
+    for number, (_, group) in enumerate(group_by_unit(rows)):
+        if number:
+            yield '\n'
+        for row in group:
+            yield SHOPPING_CART_LINE.format(**row)
+
+
+class Echo:
+    """Псевдобуфер для csv.writer, возвращающий записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow(
+            (row['name'], row['amount'], row['measurement_unit'])
+        )
+
+
+def export_json(rows):
+    yield '{'
+    for number, (unit, group) in enumerate(group_by_unit(rows)):
+        separator = ',' if number else ''
+        yield f'{separator}{json.dumps(unit, ensure_ascii=False)}:['
+        for position, row in enumerate(group):
+            separator = ',' if position else ''
+            item = {'name': row['name'], 'amount': row['amount']}
+            yield separator + json.dumps(
+                item, ensure_ascii=False, separators=(',', ':')
+            )
+        yield ']'
+    yield '}'
+
+
+EXPORTERS = {
+    'txt': export_txt,
+    'csv': export_csv,
+    'json': export_json,
+}
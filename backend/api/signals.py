@@ -0,0 +1,160 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+
+from api.caching import invalidate, invalidate_objects
+from api.counters import change_counter
+from api.feed import fan_out, follow, unfollow
+from api.models import (
+    CountOfIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    ShoppingCartIngredient,
+    Tag
+)
+from api.ranking import create_ranks
+from users.models import Follow
+
+User = get_user_model()
+
+MODEL_NAMESPACES = {
+    Tag: 'tag',
+    Ingredient: 'ingredient',
+}
+AUTH_ONLY_FIELDS = frozenset(('last_login',))
+TAG_CHANGES = ('post_add', 'post_remove', 'post_clear')
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'carts_count',
+}
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_reference_caches(sender, instance, **kwargs):
+    """
+    Версии пространств имен читают только справочники тегов
+    и ингредиентов и ключи фрагментов рецептов; изменения рецептов
+    учитываются по 'updated_at', флаги избранного, списка покупок
+    и подписки в кэш не попадают
+    """
+    invalidate(MODEL_NAMESPACES[sender])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_recipes_on_tags_change(sender, instance, action, reverse, pk_set,
+                                 **kwargs):
+    """
+    При очистке тегов со стороны тега (tag.recipes.clear()) рецепты
+    отмечаются до удаления связей: после него они уже неизвестны
+    """
+    if not reverse:
+        if action in TAG_CHANGES:
+            Recipe.objects.filter(pk=instance.pk).touch()
+    elif action == 'pre_clear':
+        instance.recipes.all().touch()
+    elif action in TAG_CHANGES and pk_set:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def touch_tag_recipes(sender, instance, created=False, **kwargs):
+    """Тег входит в представление рецептов, у которых он указан"""
+    if not created:
+        instance.recipes.all().touch()
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created=False, **kwargs):
+    """
+    Ингредиент входит в представление рецептов, в которых он указан
+    Количества ингредиентов рецепта изменяются только вместе с рецептом
+    (RecipeWriteSerializer.update), поэтому отдельно не отслеживаются
+    """
+    if not created:
+        Recipe.objects.filter(ingredient_amounts__ingredient=instance).touch()
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_author_caches(sender, instance, update_fields=None, **kwargs):
+    """
+    Профиль автора входит во фрагменты его рецептов;
+    обновление только времени входа фрагменты не затрагивает
+    """
+    if update_fields and AUTH_ONLY_FIELDS.issuperset(update_fields):
+        return
+    invalidate_objects('user', [instance.pk])
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    change_counter(Recipe, instance.recipe_id, RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_author_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_rank(sender, instance, created, **kwargs):
+    if created:
+        create_ranks([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out([instance])
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_feed(sender, instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'followers_count', 1)
+        follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_feed(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'followers_count', -1)
+    unfollow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_author_recipes_count(sender, instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_cart_totals(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.objects.change_amounts(
+            [instance.user_id],
+            CountOfIngredient.objects.amounts(instance.recipe_id),
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_cart_totals(sender, instance, **kwargs):
+    amounts = CountOfIngredient.objects.amounts(instance.recipe_id)
+    ShoppingCartIngredient.objects.change_amounts(
+        [instance.user_id],
+        {ingredient_id: -amount for ingredient_id, amount in amounts.items()},
+    )
@@ -1,16 +1,34 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAdminUser,
+    IsAuthenticated
+)
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
-from foodgram.pagination import LimitPageNumberPagination
+from foodgram.pagination import (
+    KeysetPagination,
+    LimitPageNumberOrCursorPagination
+)
+from api.caching import (
+    conditional_response,
+    ingredients_representation,
+    make_etag,
+    tags_representation
+)
+from api.feed import feed_page
 from api.filters import IngredientSearchFilter, RecipeFilter
+from api.fragments import recipe_fragments
+from api.mixins import CachedListMixin
 from api.models import (
     Favorite,
     Ingredient,
@@ -18,7 +36,20 @@ from api.models import (
     ShoppingCart,
     Tag,
 )
+from api.parsers import NDJSONParser
 from api.permissions import IsOwnerOrReadOnly
+from api.recipe_batch import (
+    IMAGE_FORMATS,
+    RECIPES_FILENAME,
+    export_recipes,
+    import_recipes,
+)
+from api.renderers import (
+    FastJSONRenderer,
+    ShoppingCartCSVRenderer,
+    ShoppingCartTextRenderer
+)
+from api.search import ingredient_index
 from api.serializers import (
     IngredientsSerializer,
     FavoriteSerializer,
@@ -27,14 +58,20 @@ from api.serializers import (
     TagSerializer,
     ShoppingCartSerializer
 )
+from api.shopping_cart import (
+    EXPORTERS,
+    SHOPPING_CART_FILENAME,
+    shopping_cart_rows,
+)
 
 User = get_user_model()
 
 
 RECIPE_NOT_EXIST = 'Данный рецепт не добавлен!'
+UNKNOWN_IMAGE_FORMAT = 'Параметр images принимает значения: {formats}'
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(CachedListMixin, viewsets.ModelViewSet):
     """ViewSet для получения данных о всех ингредиентах
     Доступно всем пользователям
     """
@@ -45,9 +82,24 @@ class IngredientViewSet(viewsets.ModelViewSet):
     search_fields = ['name']
     http_method_names = ('get', )
     pagination_class = None
+    cached_representation = ingredients_representation
+
+    def list(self, request, *args, **kwargs):
+        """
+        Поиск по названию выполняется по индексу в памяти,
+        при отключенном индексе - запросом к базе через фильтр
+        """
+        name = request.query_params.get('name')
+        if not name or not settings.INGREDIENT_SEARCH_INDEX:
+            return super().list(request, *args, **kwargs)
+        ingredients = ingredient_index.search(
+            name, limit=settings.INGREDIENT_SEARCH_LIMIT
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedListMixin, viewsets.ModelViewSet):
     """
     ViewSet для получения данных о всех тэгах
     Доступно всем пользователям
@@ -56,6 +108,7 @@ class TagViewSet(viewsets.ModelViewSet):
     serializer_class = TagSerializer
     http_method_names = ('get',)
     pagination_class = None
+    cached_representation = tags_representation
 
 
 class RecipeViewSet(ModelViewSet):
@@ -66,7 +119,26 @@ class RecipeViewSet(ModelViewSet):
     permission_classes = (IsOwnerOrReadOnly,)
     filterset_class = RecipeFilter
     filter_backends = (DjangoFilterBackend,)
-    pagination_class = LimitPageNumberPagination
+    pagination_class = LimitPageNumberOrCursorPagination
+
+    def get_queryset(self):
+        """
+        Метод получения queryset рецептов
+        Флаги 'is_favorited', 'is_in_shopping_cart' и подписки на автора
+        вычисляются в том же запросе, что и список рецептов; автор,
+        теги и ингредиенты читаются только для рецептов, которых нет
+        в кэше фрагментов
+        """
+        return Recipe.objects.with_user_flags(self.request.user)
+
+    def get_serializer_context(self):
+        """
+        В списке рецептов и в ленте отдаются миниатюры изображений
+        """
+        context = super().get_serializer_context()
+        if self.action in ('list', 'feed'):
+            context['image_rendition'] = 'thumbnail'
+        return context
 
     def get_serializer_class(self):
         """
@@ -76,6 +148,65 @@ class RecipeViewSet(ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def recipes_etag(self, recipes, *parts):
+        """
+        ETag представления рецептов, вычисляемый без сериализации:
+        ключи фрагментов рецептов (время изменения рецепта, версии профиля
+        автора, тегов и ингредиентов), флаги пользователя из того же
+        запроса и формат ответа
+        Тело ответа строится из фрагментов с теми же или более новыми
+        ключами, поэтому устаревшее тело не получает окончательный ETag
+        """
+        rendition = self.get_serializer_context().get('image_rendition')
+        keys = recipe_fragments.keys(recipes, rendition or 'image')
+        return make_etag(
+            self.request.accepted_renderer.format,
+            [
+                (
+                    keys[recipe.pk],
+                    recipe.is_favorited,
+                    recipe.is_in_shopping_cart,
+                    recipe.is_author_subscribed,
+                )
+                for recipe in recipes
+            ],
+            *parts,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт с ETag, на условный запрос - ответ 304"""
+        instance = self.get_object()
+        return conditional_response(
+            request,
+            self.recipes_etag([instance]),
+            lambda: Response(self.get_serializer(instance).data),
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов с ETag, на условный запрос - ответ 304
+        В ETag входят также ссылки и количество из ответа пагинации:
+        они меняются при добавлении рецептов на другие страницы
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            recipes = list(queryset)
+            return conditional_response(
+                request,
+                self.recipes_etag(recipes),
+                lambda: Response(
+                    self.get_serializer(recipes, many=True).data
+                ),
+            )
+        return conditional_response(
+            request,
+            self.recipes_etag(page, self.get_paginated_response([]).data),
+            lambda: self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            ),
+        )
+
     def add_to(self, request, serializer):
         serializer = serializer(
             context={'request': request},
@@ -134,20 +265,94 @@ class RecipeViewSet(ModelViewSet):
     @action(
         detail=False,
         methods=['get'],
-        permission_classes=[permissions.IsAuthenticated])
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            FastJSONRenderer,
+        ))
     def download_shopping_cart(self, request, pk=None):
-        annotated_result = Ingredient.objects.filter(
-            count_in_recipes__recipe__shopping_carts__user=request.user).annotate(
-                quantity=Sum(F'{"count_in_recipes__amount"}'))
-
-        shopping_cart = '\n'.join([
-            f'{ingredient.name} - {ingredient.quantity} '
-            f'{ingredient.measurement_unit}'
-            for ingredient in annotated_result
-        ])
-
-        filename = 'shopping_cart.txt'
-        response = HttpResponse(shopping_cart)
-        response['Content-Type'] = 'text/plain'
+        """
+        Скачивание списка покупок в формате txt, csv или json
+        Формат выбирается параметром 'format' или заголовком Accept
+        """
+        renderer = request.accepted_renderer
+        rows = shopping_cart_rows(request.user)
+        response = StreamingHttpResponse(
+            EXPORTERS[renderer.format](rows),
+            content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        filename = SHOPPING_CART_FILENAME.format(extension=renderer.format)
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,),
+        filter_backends=(),
+        pagination_class=KeysetPagination)
+    def feed(self, request):
+        """
+        Лента подписок: рецепты авторов, на которых подписан пользователь,
+        от новых к старым, с пагинацией по ключу ('cursor', 'limit')
+        """
+        recipe_ids = self.paginator.paginate_ids(
+            request, partial(feed_page, request.user)
+        )
+        recipes = self.get_queryset().filter(pk__in=recipe_ids)
+        serializer = self.get_serializer(recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=(IsAuthenticated,),
+        parser_classes=(NDJSONParser,))
+    def batch(self, request):
+        """
+        Пакетная публикация рецептов: тело запроса - NDJSON,
+        по рецепту в формате POST /api/recipes/ на строку
+        Теги можно задать slug, ингредиенты - названием и единицей измерения
+        Ошибки возвращаются по номерам строк, остальные рецепты сохраняются
+        """
+        created, errors = [], []
+        for result in import_recipes(request.data, request.user):
+            if 'id' in result:
+                created.append(result['id'])
+            else:
+                errors.append(result)
+        return Response(
+            {'created': created, 'errors': errors},
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAdminUser,))
+    def export(self, request):
+        """
+        Выгрузка всех рецептов потоком NDJSON в формате пакетного импорта
+        Параметр 'images': base64 (по умолчанию, выгрузку можно загрузить
+        пакетным импортом) или url
+        """
+        images = request.query_params.get('images', IMAGE_FORMATS[0])
+        if images not in IMAGE_FORMATS:
+            return Response(
+                {'images': UNKNOWN_IMAGE_FORMAT.format(
+                    formats=', '.join(IMAGE_FORMATS)
+                )},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        response = StreamingHttpResponse(
+            export_recipes(images, request),
+            content_type=f'{NDJSONParser.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename={RECIPES_FILENAME}'
+        )
+        return response
@@ -1,6 +1,98 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    Cursor,
+    CursorPagination,
+    PageNumberPagination
+)
+from rest_framework.response import Response
+
+CURSOR_PAGINATION = 'cursor'
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Пагинация по ключу (keyset) без OFFSET и подсчета COUNT(*)
+    Время получения страницы не зависит от ее номера
+    """
+    page_size_query_param = 'limit'
+    page_size = 6
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Сортировка, заданная фильтром (например '?ordering=-favorites'),
+        сохраняется; по умолчанию - по убыванию id
+        """
+        if queryset.query.order_by:
+            return tuple(queryset.query.order_by)
+        return super().get_ordering(request, queryset, view)
+
+
+class LimitPageNumberOrCursorPagination(LimitPageNumberPagination):
+    """
+    Постраничная пагинация с переключением на пагинацию по ключу
+    параметром '?pagination=cursor' или при наличии параметра 'cursor'
+    """
+    pagination_query_param = 'pagination'
+    cursor_pagination_class = LimitCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (
+            request.query_params.get(self.pagination_query_param)
+            == CURSOR_PAGINATION
+            or self.cursor_pagination_class.cursor_query_param
+            in request.query_params
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class KeysetPagination(LimitCursorPagination):
+    """
+    Пагинация по ключу для выборок, которые строятся не одним queryset:
+    страницу возвращает функция fetch_page(size, before) - id объектов
+    по убыванию, меньшие before, и признак следующей страницы
+    Курсор в формате CursorPagination, только вперед
+    """
+
+    def paginate_ids(self, request, fetch_page):
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        before = None
+        if cursor is not None and cursor.position is not None:
+            if not cursor.position.isdigit():
+                raise NotFound(self.invalid_cursor_message)
+            before = int(cursor.position)
+        ids, has_next = fetch_page(self.get_page_size(request), before)
+        self.next_position = str(ids[-1]) if has_next else None
+        return ids
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=False, position=self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict((
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        )))
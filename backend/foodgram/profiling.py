@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger('foodgram.profiling')
+
+current_profile = ContextVar('current_profile', default=None)
+
+PARAMETER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+SERVER_TIMING_FIELD = 'ser{number};desc="{name} x{calls}";dur={duration:.2f}'
+SERVER_TIMING_SERIALIZE = 'serialize;desc="{names}";dur={duration:.2f}'
+
+
+def fingerprint(sql):
+    """
+    Отпечаток запроса: SQL без значений параметров,
+    списки IN (%s, %s, ...) любой длины считаются одинаковыми
+    """
+    return PARAMETER_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    """
+    Статистика одного запроса: обращения к базе данных,
+    время сериализации по сериализаторам и по полям
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.fields = {}
+        self.serializers = {}
+        self.serializing = False
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def add_field_time(self, name, duration, calls=1):
+        total, count = self.fields.get(name, (0.0, 0))
+        self.fields[name] = (total + duration, count + calls)
+
+    def add_serializer_time(self, name, duration):
+        total, calls = self.serializers.get(name, (0.0, 0))
+        self.serializers[name] = (total + duration, calls + 1)
+
+    def serialize_time(self):
+        return sum(duration for duration, _ in self.serializers.values())
+
+    def duplicates(self):
+        return [
+            {
+                'fingerprint': hashlib.sha1(sql.encode()).hexdigest()[:12],
+                'count': count,
+                'sql': sql,
+            }
+            for sql, count in self.fingerprints.most_common()
+            if count > 1
+        ]
+
+    def slowest_fields(self):
+        return sorted(
+            self.fields.items(), key=lambda item: item[1][0], reverse=True
+        )[:settings.PROFILING_TOP_FIELDS]
+
+    def server_timing(self, total):
+        timings = [
+            f'total;dur={total * 1000:.2f}',
+            f'db;desc="{self.queries} queries";dur={self.db_time * 1000:.2f}',
+        ]
+        if self.serializers:
+            timings.append(SERVER_TIMING_SERIALIZE.format(
+                names=' '.join(self.serializers),
+                duration=self.serialize_time() * 1000,
+            ))
+        for number, (name, (duration, calls)) in enumerate(
+            self.slowest_fields()
+        ):
+            timings.append(SERVER_TIMING_FIELD.format(
+                number=number, name=name, calls=calls,
+                duration=duration * 1000,
+            ))
+        return ', '.join(timings)
+
+    def as_dict(self, request, response, total):
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 2),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'duplicate_queries': self.duplicates(),
+            'serialize_ms': round(self.serialize_time() * 1000, 3),
+            'serializers': {
+                name: {'ms': round(duration * 1000, 3), 'calls': calls}
+                for name, (duration, calls) in self.serializers.items()
+            },
+            'serializer_fields': {
+                name: {'ms': round(duration * 1000, 3), 'calls': calls}
+                for name, (duration, calls) in self.slowest_fields()
+            },
+        }
+
+
+def timed(method, name, counted):
+    """
+    Метод поля с замером времени; counted - считать ли вызов
+    (get_attribute и to_representation поля дают один вызов)
+    """
+
+    def wrapper(*args, **kwargs):
+        profile = current_profile.get()
+        if profile is None:
+            return method(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profile.add_field_time(
+                name, time.perf_counter() - started, int(counted)
+            )
+
+    return wrapper
+
+
+def instrument_fields(serializer):
+    """
+    Оборачивает get_attribute и to_representation полей экземпляра
+    сериализатора: поля копируются для каждого экземпляра, поэтому
+    классы полей DRF не изменяются
+    """
+    if serializer.__dict__.get('_profiled_fields'):
+        return
+    serializer_name = type(serializer).__name__
+    for field in serializer.fields.values():
+        name = f'{serializer_name}.{field.field_name}'
+        field.get_attribute = timed(field.get_attribute, name, False)
+        field.to_representation = timed(field.to_representation, name, True)
+    serializer._profiled_fields = True
+
+
+def profiled_to_representation(to_representation):
+    """
+    Serializer.to_representation с замером времени каждого поля,
+    представление строит исходный метод DRF
+    Время вложенных сериализаторов учитывается и в родительском поле
+    """
+
+    def profiled(self, instance):
+        if current_profile.get() is not None:
+            instrument_fields(self)
+        return to_representation(self, instance)
+
+    return profiled
+
+
+def profiled_data(data):
+    """
+    Свойство .data с замером полного времени сериализации, вложенные
+    вызовы не учитываются отдельно
+    RecipeReadSerializer строит представление из фрагментов, минуя
+    Serializer.to_representation, его время видно только здесь
+    """
+
+    def profiled(self):
+        profile = current_profile.get()
+        if profile is None or profile.serializing:
+            return data.fget(self)
+        profile.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(self)
+        finally:
+            profile.serializing = False
+            profile.add_serializer_time(
+                type(getattr(self, 'child', self)).__name__,
+                time.perf_counter() - started,
+            )
+
+    return property(profiled)
+
+
+PATCHES = {
+    (serializers.Serializer, 'to_representation'): profiled_to_representation,
+    (serializers.Serializer, 'data'): profiled_data,
+    (serializers.ListSerializer, 'data'): profiled_data,
+}
+ORIGINALS = {
+    (serializer_class, name): serializer_class.__dict__[name]
+    for serializer_class, name in PATCHES
+}
+
+
+def install_patches():
+    """Подменяет методы сериализаторов DRF обертками с замером времени"""
+    for (serializer_class, name), wrap in PATCHES.items():
+        setattr(
+            serializer_class, name, wrap(ORIGINALS[serializer_class, name])
+        )
+
+
+def remove_patches():
+    """Возвращает исходные методы сериализаторов DRF"""
+    for (serializer_class, name), original in ORIGINALS.items():
+        setattr(serializer_class, name, original)
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запросов: количество и время запросов к базе данных,
+    повторяющиеся запросы, время сериализации по полям
+    Результат отдается в заголовке Server-Timing и пишется в лог
+    'foodgram.profiling' одной строкой JSON
+    При PROFILING_ENABLED = False middleware не подключается, а методы
+    сериализаторов DRF остаются исходными
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            remove_patches()
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_patches()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(profile.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        total = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing(total)
+        logger.info(json.dumps(
+            profile.as_dict(request, response, total), ensure_ascii=False
+        ))
+        return response
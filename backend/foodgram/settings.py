@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.User'
 
 MIDDLEWARE = [
+    'foodgram.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +71,37 @@ DATABASES = {
     }
 }
 
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': 'foodgram',
+    'file': '/tmp/foodgram-cache',
+    'redis': 'redis://localhost:6379/1',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', default='file')
+# Фрагменты рецептов хранятся по одному на рецепт и вид изображения:
+# при стандартных 300 записях file и locmem постоянно вытесняли бы их
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', default=50000))
+CACHE_OPTIONS = {
+    'locmem': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    'file': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    'redis': {},
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv('CACHE_LOCATION', default=CACHE_LOCATIONS[CACHE_BACKEND]),
+        'KEY_PREFIX': 'foodgram',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': CACHE_OPTIONS[CACHE_BACKEND],
+    }
+}
+CACHE_STATS_FLUSH_INTERVAL = 10
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -77,6 +110,17 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 
@@ -131,3 +175,56 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+INGREDIENT_SEARCH_INDEX = True
+INGREDIENT_SEARCH_LIMIT = None
+
+RECIPE_IMAGE_FORMAT = 'WEBP'
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_RENDITIONS = {
+    'image': (1280, 1280),
+    'thumbnail': (480, 480),
+    'small_thumbnail': (160, 160),
+}
+RECIPE_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_QUEUE_SIZE = 16
+
+RECIPE_BATCH_CHUNK_SIZE = 100
+RECIPE_FAST_REPRESENTATION = os.getenv(
+    'RECIPE_FAST_REPRESENTATION', default='True'
+) == 'True'
+
+RECIPE_RANK_WEIGHTS = {
+    'favorite': 2.0,
+    'shopping_cart': 1.0,
+}
+RECIPE_TRENDING_HALF_LIFE = timedelta(days=3)
+RECIPE_RANK_LAG = timedelta(seconds=30)
+
+FEED_FANOUT_THRESHOLD = int(os.getenv('FEED_FANOUT_THRESHOLD', 1000))
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', default='False') == 'True'
+PROFILING_TOP_FIELDS = 10
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'foodgram.images': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,127 @@
+import base64
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from api.models import (
+    CountOfIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag
+)
+from users.models import Follow
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0e'
+    'cCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5E'
+    'rkJggg=='
+)
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodgram-tests',
+        }
+    }
+    settings.RECIPE_IMAGE_WORKERS = 0
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='reader', email='reader@foodgram.ru', password='Pass12345!',
+        first_name='Reader', last_name='Readers',
+    )
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'author{number}', email=f'author{number}@foodgram.ru',
+            password='Pass12345!', first_name='Author', last_name=str(number),
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(
+            name=f'Тег {number}', color='#E26C2D', slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=f'ингредиент {number}',
+                                  measurement_unit='г')
+        for number in range(4)
+    ]
+
+
+def create_recipe(author, tags, ingredients, number, image='recipes/a.png'):
+    recipe = Recipe.objects.create(
+        author=author, name=f'Рецепт {number}', text='Описание',
+        cooking_time=number + 1, image=image,
+    )
+    recipe.tags.set(tags)
+    CountOfIngredient.objects.bulk_create(
+        CountOfIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for amount, ingredient in enumerate(ingredients, start=1)
+    )
+    return recipe
+
+
+@pytest.fixture
+def make_recipe():
+    return create_recipe
+
+
+@pytest.fixture
+def recipes(user, authors, tags, ingredients):
+    """
+    60 рецептов трех авторов с несколькими тегами и ингредиентами,
+    часть - в избранном и в списке покупок пользователя,
+    на первого автора пользователь подписан
+    """
+    recipes = [
+        create_recipe(
+            authors[number % len(authors)],
+            tags[:1 + number % len(tags)],
+            ingredients[:1 + number % len(ingredients)],
+            number,
+        )
+        for number in range(60)
+    ]
+    for recipe in recipes[::2]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    for recipe in recipes[::3]:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    Follow.objects.create(user=user, author=authors[0])
+    return recipes
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
@@ -0,0 +1,21 @@
+import pytest
+
+from api.benchmarks import seed
+from api.counters import reconcile_counters
+from api.feed import feed_page
+from api.models import FeedEntry
+from users.models import Follow
+
+
+@pytest.mark.django_db
+def test_seed_keeps_denormalized_data_consistent():
+    """После заполнения счетчики совпадают с данными, ленты построены"""
+    seed(users=5, recipes=30, ingredients=20, favorites_per_user=5,
+         carts_per_user=3, follows_per_user=2, heavy_cart=5)
+    assert reconcile_counters(fix=False) == []
+    assert FeedEntry.objects.exists()
+    follow = Follow.objects.first()
+    recipe_ids, _ = feed_page(follow.user, 100)
+    assert set(
+        follow.author.recipes.values_list('pk', flat=True)
+    ) <= set(recipe_ids)
@@ -0,0 +1,25 @@
+import pytest
+
+from api.caching import NAMESPACES, namespaced_cache
+from api.models import Favorite
+
+
+@pytest.mark.django_db(transaction=True)
+def test_row_changes_do_not_bump_namespaces(user, recipes):
+    """Изменения рецептов и избранного не увеличивают версии"""
+    versions = namespaced_cache.versions(NAMESPACES)
+    recipe = recipes[1]
+    Favorite.objects.create(user=user, recipe=recipe)
+    recipe.name = 'Новое название'
+    recipe.save()
+    assert namespaced_cache.versions(NAMESPACES) == versions
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reference_change_bumps_its_namespace(tags):
+    versions = namespaced_cache.versions(NAMESPACES)
+    tags[0].name = 'Новый тег'
+    tags[0].save()
+    changed = namespaced_cache.versions(NAMESPACES)
+    assert changed['tag'] != versions['tag']
+    assert changed['ingredient'] == versions['ingredient']
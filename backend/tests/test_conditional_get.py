@@ -0,0 +1,138 @@
+import pytest
+
+from api.models import Ingredient, Tag
+
+LIST_URL = '/api/recipes/?limit=6'
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def detail_url(recipe):
+    return f'/api/recipes/{recipe.pk}/'
+
+
+@pytest.mark.parametrize('url', (LIST_URL, None))
+def test_not_modified(client, recipes, url):
+    url = url or detail_url(recipes[-1])
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert client.get(url)['ETag'] == etag
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+    assert client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+def test_etag_changes_after_favorite(client, recipes):
+    recipe = recipes[-1]
+    list_etag = client.get(LIST_URL)['ETag']
+    detail_etag = client.get(detail_url(recipe))['ETag']
+    response = client.post(f'/api/recipes/{recipe.pk}/favorite/')
+    assert response.status_code == 201
+    assert client.get(LIST_URL)['ETag'] != list_etag
+    response = client.get(
+        detail_url(recipe), HTTP_IF_NONE_MATCH=detail_etag
+    )
+    assert response.status_code == 200
+    assert response.json()['is_favorited'] is True
+
+
+def assert_changed(client, recipe, change, check):
+    """
+    После изменения ETag рецепта меняется, а тело ответа
+    с новым ETag уже содержит изменение
+    """
+    url = detail_url(recipe)
+    etag = client.get(url)['ETag']
+    change()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert check(response.json())
+    assert client.get(url)['ETag'] == response['ETag']
+
+
+def test_etag_changes_after_tag_rename(client, recipes):
+    recipe = recipes[-1]
+    tag = recipe.tags.first()
+
+    def rename():
+        renamed = Tag.objects.get(pk=tag.pk)
+        renamed.name = 'Новый тег'
+        renamed.save()
+
+    assert_changed(client, recipe, rename, lambda data: 'Новый тег' in [
+        item['name'] for item in data['tags']
+    ])
+
+
+def test_etag_changes_after_ingredient_rename(client, recipes):
+    recipe = recipes[-1]
+    amount = recipe.ingredient_amounts.first()
+
+    def rename():
+        ingredient = Ingredient.objects.get(pk=amount.ingredient_id)
+        ingredient.name = 'новый ингредиент'
+        ingredient.save()
+
+    assert_changed(
+        client, recipe, rename,
+        lambda data: 'новый ингредиент' in [
+            item['name'] for item in data['ingredients']
+        ],
+    )
+
+
+def test_etag_changes_after_author_rename(client, recipes):
+    recipe = recipes[-1]
+
+    def rename():
+        recipe.author.first_name = 'Новое имя'
+        recipe.author.save()
+
+    assert_changed(
+        client, recipe, rename,
+        lambda data: data['author']['first_name'] == 'Новое имя',
+    )
+
+
+def test_etag_changes_after_page_boundary_change(client, recipes,
+                                                 make_recipe, authors):
+    """
+    Удаление рецепта с последней страницы меняет количество в ответе
+    первой, новый рецепт сдвигает рецепты второй страницы
+    """
+    second_page = LIST_URL + '&page=2'
+    first_etag = client.get(LIST_URL)['ETag']
+    recipes[0].delete()
+    assert client.get(LIST_URL)['ETag'] != first_etag
+
+    second_etag = client.get(second_page)['ETag']
+    make_recipe(authors[0], [], [], 200)
+    response = client.get(second_page, HTTP_IF_NONE_MATCH=second_etag)
+    assert response.status_code == 200
+    assert response.json()['results'][0]['id'] == recipes[-6].pk
+
+
+@pytest.mark.parametrize('url, model', (
+    ('/api/tags/', Tag), ('/api/ingredients/', Ingredient),
+))
+def test_reference_list_conditional_get(anonymous_client, tags, ingredients,
+                                        url, model):
+    """Справочники: 304 по ETag, новый ETag после изменения записи"""
+    response = anonymous_client.get(url)
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert response['Last-Modified']
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+
+    obj = model.objects.order_by('pk').first()
+    obj.name = 'Новое название'
+    obj.save()
+    response = anonymous_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert response.json()[0]['name'] == 'Новое название'
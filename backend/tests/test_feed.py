@@ -0,0 +1,112 @@
+import pytest
+
+from api.feed import feed_page, rebuild_feeds
+from api.models import FeedEntry, Recipe
+from tests.conftest import create_recipe
+from users.models import Follow
+
+
+def feed_ids(user, size=100):
+    ids, _ = feed_page(user, size)
+    return ids
+
+
+@pytest.mark.django_db
+def test_fan_out_below_threshold(settings, user, authors):
+    settings.FEED_FANOUT_THRESHOLD = 2
+    Follow.objects.create(user=user, author=authors[0])
+    recipe = create_recipe(authors[0], [], [], 0)
+    recipe.refresh_from_db()
+    assert recipe.fanned_out
+    assert list(FeedEntry.objects.filter(user=user).values_list(
+        'recipe_id', flat=True
+    )) == [recipe.pk]
+    assert feed_ids(user) == [recipe.pk]
+
+
+@pytest.mark.django_db
+def test_no_fan_out_at_threshold(settings, user, authors):
+    """Рецепт популярного автора попадает в ленту при чтении"""
+    settings.FEED_FANOUT_THRESHOLD = 1
+    Follow.objects.create(user=user, author=authors[0])
+    recipe = create_recipe(authors[0], [], [], 0)
+    recipe.refresh_from_db()
+    assert not recipe.fanned_out
+    assert not FeedEntry.objects.exists()
+    assert feed_ids(user) == [recipe.pk]
+
+
+@pytest.mark.django_db
+def test_feed_page_merges_pulled_and_fanned_out(settings, user, authors):
+    settings.FEED_FANOUT_THRESHOLD = 2
+    Follow.objects.create(user=user, author=authors[0])
+    Follow.objects.create(user=user, author=authors[1])
+    Follow.objects.create(user=authors[2], author=authors[1])
+    recipes = [
+        create_recipe(authors[number % 3], [], [], number)
+        for number in range(9)
+    ]
+    pulled = Recipe.objects.filter(author=authors[1], fanned_out=False)
+    assert pulled.count() == 3
+    expected = [
+        recipe.pk for recipe in reversed(recipes)
+        if recipe.author_id != authors[2].pk
+    ]
+    ids, has_next = feed_page(user, 4)
+    assert (ids, has_next) == (expected[:4], True)
+    ids, has_next = feed_page(user, 4, before=ids[-1])
+    assert (ids, has_next) == (expected[4:], False)
+
+
+@pytest.mark.django_db
+def test_feed_endpoint_pages(settings, client, user, authors):
+    settings.FEED_FANOUT_THRESHOLD = 2
+    Follow.objects.create(user=user, author=authors[0])
+    recipes = [
+        create_recipe(authors[0], [], [], number) for number in range(5)
+    ]
+    first = client.get('/api/recipes/feed/?limit=3').json()
+    second = client.get(first['next']).json()
+    assert [
+        recipe['id'] for recipe in first['results'] + second['results']
+    ] == [recipe.pk for recipe in reversed(recipes)]
+    assert second['next'] is None
+
+
+@pytest.mark.django_db
+def test_follow_and_unfollow(settings, user, authors):
+    """Подписка добавляет разосланные рецепты автора, отписка удаляет"""
+    settings.FEED_FANOUT_THRESHOLD = 2
+    Follow.objects.create(user=authors[1], author=authors[0])
+    recipes = [
+        create_recipe(authors[0], [], [], number) for number in range(3)
+    ]
+    assert feed_ids(user) == []
+    follow = Follow.objects.create(user=user, author=authors[0])
+    assert feed_ids(user) == [recipe.pk for recipe in reversed(recipes)]
+    follow.delete()
+    assert feed_ids(user) == []
+    assert not FeedEntry.objects.filter(user=user).exists()
+    assert FeedEntry.objects.filter(user=authors[1]).count() == 3
+
+
+@pytest.mark.django_db
+def test_rebuild_feeds_many_entries(settings, django_user_model, authors):
+    """Вставка записей лент не превышает ограничения SQLite на запрос"""
+    settings.FEED_FANOUT_THRESHOLD = 1000
+    django_user_model.objects.bulk_create(
+        django_user_model(
+            username=f'follower{number}',
+            email=f'follower{number}@foodgram.ru',
+        )
+        for number in range(30)
+    )
+    followers = django_user_model.objects.filter(
+        username__startswith='follower'
+    )
+    Follow.objects.bulk_create(
+        Follow(user=follower, author=authors[0]) for follower in followers
+    )
+    for number in range(40):
+        create_recipe(authors[0], [], [], number)
+    assert rebuild_feeds() == 30 * 40
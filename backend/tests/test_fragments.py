@@ -0,0 +1,63 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import Recipe
+from api.serializers import RecipeReadSerializer
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_instance_does_not_replace_new_fragment(client, recipes):
+    """
+    Рецепт, прочитанный до изменения и сериализованный после него,
+    не попадает в кэш под ключом новой версии
+    """
+    recipe = recipes[-1]
+    page = list(Recipe.objects.with_user_flags(None).filter(pk=recipe.pk))
+    saved = Recipe.objects.get(pk=recipe.pk)
+    saved.name = 'Новое название'
+    saved.save()
+    assert RecipeReadSerializer(page, many=True).data[0]['name'] == (
+        recipe.name
+    )
+
+    response = client.get(f'/api/recipes/{recipe.pk}/')
+    assert response.json()['name'] == 'Новое название'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fragment_follows_tags(client, recipes, tags):
+    recipe = recipes[-1]
+    url = f'/api/recipes/{recipe.pk}/'
+    client.get(url)
+    recipe.tags.set(tags[:1])
+    data = client.get(url).json()
+    assert [tag['id'] for tag in data['tags']] == [tags[0].pk]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fragment_follows_ingredients(client, recipes, ingredients):
+    """Количества ингредиентов изменяются вместе с рецептом"""
+    recipe = recipes[-1]
+    url = f'/api/recipes/{recipe.pk}/'
+    client.get(url)
+    author_client = APIClient()
+    author_client.force_authenticate(recipe.author)
+    author_client.patch(
+        url,
+        {'ingredients': [{'id': ingredients[-1].pk, 'amount': 1}]},
+        format='json',
+    )
+    data = client.get(url).json()
+    assert ingredients[0].pk not in [
+        ingredient['id'] for ingredient in data['ingredients']
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_fragment_follows_author(client, recipes):
+    recipe = recipes[-1]
+    url = f'/api/recipes/{recipe.pk}/'
+    client.get(url)
+    recipe.author.first_name = 'Новое имя'
+    recipe.author.save()
+    assert client.get(url).json()['author']['first_name'] == 'Новое имя'
@@ -0,0 +1,65 @@
+import pytest
+
+from api.models import Ingredient
+from api.search import ingredient_index
+
+NAMES = (
+    'Соль', 'соль морская', 'Морская соль', 'сахар', 'сахарная пудра',
+    'Пудра сахарная', 'ванильный сахар', 'мука', 'Солод',
+)
+
+
+@pytest.fixture
+def catalogue():
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='г') for name in NAMES
+    )
+
+
+def names(ingredients):
+    return [ingredient.name for ingredient in ingredients]
+
+
+@pytest.mark.django_db
+def test_prefix_matches_first(catalogue):
+    """Сначала начинающиеся с запроса по алфавиту, затем содержащие его"""
+    assert names(ingredient_index.search('сахар')) == [
+        'сахар', 'сахарная пудра', 'ванильный сахар', 'Пудра сахарная',
+    ]
+
+
+@pytest.mark.django_db
+def test_case_folding(catalogue):
+    assert names(ingredient_index.search('СОЛ')) == [
+        'Солод', 'Соль', 'соль морская', 'Морская соль',
+    ]
+
+
+@pytest.mark.django_db
+def test_short_query_scans_all(catalogue):
+    """Запрос короче триграммы ищется без индекса триграмм"""
+    assert names(ingredient_index.search('ук')) == ['мука']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit, expected', (
+    (2, ['сахар', 'сахарная пудра']),
+    (3, ['сахар', 'сахарная пудра', 'ванильный сахар']),
+))
+def test_limit(catalogue, limit, expected):
+    assert names(ingredient_index.search('сахар', limit=limit)) == expected
+
+
+@pytest.mark.django_db
+def test_no_matches(catalogue):
+    assert ingredient_index.search('перец') == []
+
+
+@pytest.mark.django_db
+def test_endpoint(settings, anonymous_client, catalogue):
+    settings.INGREDIENT_SEARCH_LIMIT = 3
+    response = anonymous_client.get('/api/ingredients/?name=Сахар')
+    assert response.status_code == 200
+    assert [ingredient['name'] for ingredient in response.json()] == [
+        'сахар', 'сахарная пудра', 'ванильный сахар',
+    ]
@@ -0,0 +1,109 @@
+import io
+import json
+from base64 import b64encode
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APIClient
+
+from api.parsers import (
+    NOT_AN_OBJECT,
+    FastJSONParser,
+    NDJSONParser,
+    parse_ndjson
+)
+from tests.conftest import PNG
+
+MALFORMED = (b'{"name":', b'{"name": "a",}', b'[1, 2', b'\xff\xfe')
+
+
+@pytest.mark.parametrize('body', (
+    b'{"name": "\xd0\xa1\xd0\xbe\xd0\xbb\xd1\x8c", "amount": 1.5}',
+    b'[1, {"a": null}]',
+))
+def test_same_as_json_parser(body):
+    assert FastJSONParser().parse(io.BytesIO(body)) == (
+        JSONParser().parse(io.BytesIO(body))
+    )
+
+
+@pytest.mark.parametrize('body', MALFORMED)
+def test_malformed_body_raises_parse_error(body):
+    with pytest.raises(ParseError) as error:
+        FastJSONParser().parse(io.BytesIO(body))
+    assert str(error.value.detail).startswith('JSON parse error - ')
+
+
+def test_other_encoding_uses_json_parser():
+    body = '{"name": "Соль"}'.encode('cp1251')
+    data = FastJSONParser().parse(
+        io.BytesIO(body), parser_context={'encoding': 'cp1251'}
+    )
+    assert data == {'name': 'Соль'}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('body', MALFORMED)
+def test_malformed_request_returns_400(client, body):
+    response = client.post(
+        '/api/recipes/', body, content_type='application/json'
+    )
+    assert response.status_code == 400
+    assert response.json()['detail'].startswith('JSON parse error - ')
+
+
+def test_parse_ndjson_reports_lines():
+    """Ошибка строки не прерывает разбор, пустые строки пропускаются"""
+    stream = io.BytesIO(b'{"a": 1}\n{bad\n\n[1]\n  {"b": 2}  \n"text"')
+    results = list(NDJSONParser().parse(stream))
+    assert [number for number, _, _ in results] == [1, 2, 4, 5, 6]
+    assert results[0] == (1, {'a': 1}, None)
+    assert results[1][1] is None
+    assert results[1][2].startswith('Некорректный JSON: ')
+    assert results[2] == (4, None, NOT_AN_OBJECT)
+    assert results[3] == (5, {'b': 2}, None)
+    assert results[4] == (6, None, NOT_AN_OBJECT)
+
+
+def test_parse_ndjson_is_lazy():
+    """Строки читаются по мере разбора"""
+    lines = iter((b'{"a": 1}\n', b'{bad\n'))
+    results = parse_ndjson(lines)
+    assert next(results) == (1, {'a': 1}, None)
+    assert next(lines) == b'{bad\n'
+
+
+@pytest.mark.django_db
+def test_batch_reports_errors_by_line(settings, tmp_path, user, tags,
+                                      ingredients):
+    settings.MEDIA_ROOT = str(tmp_path)
+    recipe = {
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+        'image': 'data:image/png;base64,' + b64encode(PNG).decode(),
+        'tags': [tags[0].slug],
+        'ingredients': [{'id': ingredients[0].pk, 'amount': 2}],
+    }
+    lines = (
+        json.dumps(recipe),
+        '{bad',
+        '',
+        '[1]',
+        json.dumps(dict(recipe, cooking_time=None)),
+        json.dumps(dict(recipe, tags=['unknown'])),
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.post(
+        '/api/recipes/batch/', '\n'.join(lines).encode(),
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert len(data['created']) == 1
+    errors = {error['line']: error['errors'] for error in data['errors']}
+    assert errors.keys() == {2, 4, 5, 6}
+    assert errors[2]['non_field_errors'][0].startswith('Некорректный JSON: ')
+    assert errors[4] == {'non_field_errors': [NOT_AN_OBJECT]}
+    assert 'cooking_time' in errors[5]
+    assert 'tags' in errors[6]
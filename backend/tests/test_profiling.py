@@ -0,0 +1,63 @@
+import re
+
+import pytest
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from foodgram.profiling import ORIGINALS
+
+SERIALIZE_TIMING = re.compile(
+    r'serialize;desc="(?P<names>[^"]*)";dur=(?P<duration>[\d.]+)'
+)
+FIELD_TIMING = re.compile(r'ser\d+;desc="(?P<name>[\w.]+) x(?P<calls>\d+)"')
+
+
+@pytest.fixture
+def profiling(settings):
+    """
+    Включает профилирование; методы сериализаторов DRF восстанавливаются
+    при создании middleware с выключенным профилированием
+    """
+    settings.PROFILING_ENABLED = True
+    yield
+    settings.PROFILING_ENABLED = False
+    APIClient().get('/api/tags/')
+    assert_original_serializers()
+
+
+def assert_original_serializers():
+    for (serializer_class, name), original in ORIGINALS.items():
+        assert serializer_class.__dict__[name] is original
+
+
+@pytest.mark.django_db
+def test_server_timing_includes_recipe_serialization(profiling, recipes):
+    """Время сериализации списка рецептов из фрагментов не теряется"""
+    response = APIClient().get('/api/recipes/?limit=50')
+    timing = SERIALIZE_TIMING.search(response['Server-Timing'])
+    assert timing is not None
+    assert timing['names'] == 'RecipeReadSerializer'
+    assert float(timing['duration']) > 0
+
+
+@pytest.mark.django_db
+def test_server_timing_includes_fields(profiling, client, recipes):
+    """Поля считаются по одному вызову на объект"""
+    response = client.get('/api/users/subscriptions/?recipes_limit=3')
+    calls = {
+        timing['name']: int(timing['calls'])
+        for timing in FIELD_TIMING.finditer(response['Server-Timing'])
+    }
+    assert calls['FollowListSerializer.recipes'] == 1
+    assert calls['RecipeFollowSerializer.name'] == 3
+
+
+@pytest.mark.django_db
+def test_profiling_disabled_restores_serializers(settings, profiling):
+    APIClient().get('/api/tags/')
+    assert serializers.Serializer.__dict__['data'] is not ORIGINALS[
+        serializers.Serializer, 'data'
+    ]
+    settings.PROFILING_ENABLED = False
+    APIClient().get('/api/tags/')
+    assert_original_serializers()
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from api.models import Favorite, Recipe, RecipeRank, ShoppingCart
+from api.ranking import recompute_ranks
+
+
+@pytest.mark.django_db
+def test_every_recipe_has_rank(recipes, make_recipe, authors):
+    recipe = make_recipe(authors[0], [], [], 100)
+    assert RecipeRank.objects.filter(recipe=recipe).exists()
+    assert RecipeRank.objects.count() == Recipe.objects.count()
+
+
+@pytest.mark.django_db
+def test_popular_ordering(client, recipes, django_user_model):
+    """
+    Рецепты сортируются по рейтингу, рецепты без добавлений
+    остаются в выдаче
+    """
+    Favorite.objects.all().delete()
+    ShoppingCart.objects.all().delete()
+    fans = [
+        django_user_model.objects.create_user(
+            username=f'fan{number}', email=f'fan{number}@foodgram.ru',
+            password='Pass12345!',
+        )
+        for number in range(2)
+    ]
+    for fan in fans:
+        Favorite.objects.create(user=fan, recipe=recipes[0])
+    Favorite.objects.create(user=fans[0], recipe=recipes[1])
+    recompute_ranks(full=True, now=timezone.now() + timedelta(minutes=1))
+
+    response = client.get('/api/recipes/?ordering=popular&limit=100')
+    data = response.json()
+    ids = [recipe['id'] for recipe in data['results']]
+    assert ids[:2] == [recipes[0].pk, recipes[1].pk]
+    assert data['count'] == len(recipes)
+    assert ids[2:] == sorted(ids[2:], reverse=True)
+
+
+@pytest.mark.django_db
+def test_full_recompute_restores_missing_ranks(recipes):
+    RecipeRank.objects.filter(recipe__in=recipes[:5]).delete()
+    recompute_ranks(full=True)
+    assert RecipeRank.objects.count() == len(recipes)
+
+
+@pytest.mark.django_db
+def test_popular_ordering_with_cursor(client, recipes):
+    recompute_ranks(full=True, now=timezone.now() + timedelta(minutes=1))
+    url = '/api/recipes/?ordering=popular&pagination=cursor&limit=7'
+    ids = []
+    while url:
+        data = client.get(url).json()
+        ids.extend(recipe['id'] for recipe in data['results'])
+        url = data['next']
+    assert sorted(ids) == sorted(recipe.pk for recipe in recipes)
+    assert ids == list(Recipe.objects.order_by_rank(
+        RecipeRank.POPULAR
+    ).values_list('pk', flat=True))
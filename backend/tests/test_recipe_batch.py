@@ -0,0 +1,38 @@
+import pytest
+from django.core.files.base import ContentFile
+from rest_framework.test import APIClient
+
+from api.models import Recipe
+from tests.conftest import PNG
+
+
+@pytest.mark.django_db
+def test_default_export_can_be_imported(settings, tmp_path, authors, tags,
+                                        ingredients, make_recipe,
+                                        django_user_model):
+    """Выгрузка с параметрами по умолчанию загружается пакетным импортом"""
+    settings.MEDIA_ROOT = str(tmp_path)
+    recipe = make_recipe(authors[0], tags[:2], ingredients[:3], 1)
+    recipe.image.save('source.png', ContentFile(PNG))
+    admin = django_user_model.objects.create_superuser(
+        username='admin', email='admin@foodgram.ru', password='Pass12345!'
+    )
+    client = APIClient()
+    client.force_authenticate(admin)
+    export = client.get('/api/recipes/export/')
+    body = b''.join(export.streaming_content)
+    assert export.status_code == 200
+    assert b'data:image/png;base64,' in body
+
+    response = client.post(
+        '/api/recipes/batch/', body,
+        content_type='application/x-ndjson',
+    )
+    assert response.status_code == 201, response.json()
+    assert response.json()['errors'] == []
+    imported = Recipe.objects.get(pk=response.json()['created'][0])
+    assert imported.name == recipe.name
+    assert set(imported.tags.values_list('slug', flat=True)) == {
+        tag.slug for tag in tags[:2]
+    }
+    assert imported.ingredient_amounts.count() == 3
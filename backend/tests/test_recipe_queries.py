@@ -0,0 +1,54 @@
+import pytest
+
+# Страница рецептов при пустом кэше: фильтр тегов, COUNT, рецепты
+# с флагами пользователя, авторы, теги, ингредиенты рецептов
+# и два справочника; с кэшем фрагментов - фильтр тегов, COUNT и рецепты
+LIST_QUERIES_COLD = 8
+LIST_QUERIES_WARM = 3
+# Рецепт - те же запросы без COUNT
+DETAIL_QUERIES_COLD = 7
+DETAIL_QUERIES_WARM = 2
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (6, 50))
+def test_recipe_list_query_count(client, recipes, limit,
+                                 django_assert_num_queries):
+    """Число запросов списка рецептов не зависит от размера страницы"""
+    url = f'/api/recipes/?limit={limit}'
+    with django_assert_num_queries(LIST_QUERIES_COLD):
+        response = client.get(url)
+    assert len(response.json()['results']) == limit
+    with django_assert_num_queries(LIST_QUERIES_WARM):
+        client.get(url)
+
+
+@pytest.mark.django_db
+def test_recipe_detail_query_count(client, recipes,
+                                   django_assert_num_queries):
+    """Флаги пользователя и подписка на автора - в запросе рецепта"""
+    recipe = recipes[0]
+    url = f'/api/recipes/{recipe.pk}/'
+    with django_assert_num_queries(DETAIL_QUERIES_COLD):
+        response = client.get(url)
+    data = response.json()
+    assert data['is_favorited'] is True
+    assert data['is_in_shopping_cart'] is True
+    assert data['author']['is_subscribed'] is True
+    with django_assert_num_queries(DETAIL_QUERIES_WARM):
+        client.get(url)
+
+
+@pytest.mark.django_db
+def test_recipe_list_query_count_ignores_relations(
+    client, recipes, ingredients, tags, django_assert_num_queries
+):
+    """Число запросов не зависит от числа тегов и ингредиентов рецептов"""
+    for recipe in recipes[-6:]:
+        recipe.tags.set(tags)
+    with django_assert_num_queries(LIST_QUERIES_COLD):
+        response = client.get('/api/recipes/?limit=6')
+    assert all(
+        len(recipe['tags']) == len(tags)
+        for recipe in response.json()['results']
+    )
@@ -0,0 +1,180 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import (
+    CountOfIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart
+)
+from api.serializers import RecipeWriteSerializer
+from tests.conftest import create_recipe
+from users.models import Follow
+
+# Изменение рецепта: проверка тегов, рецепт, автор, два справочника,
+# точка сохранения, рецепт, количества (чтение, удаление, вставка),
+# списки покупок, точка сохранения, повторное чтение рецепта для ответа
+# (рецепт, автор, теги, количества)
+UPDATE_QUERIES = 16
+# Удаление рецепта: проверка тегов, рецепт, автор, связанные строки
+# (теги, избранное, списки покупок) и удаление по таблицам,
+# счетчик рецептов автора
+DELETE_QUERIES = 13
+# Изменение ингредиентов и тегов: те же запросы, обновление количеств
+# одним запросом и теги (чтение, выборка для удаления, удаление, вставка)
+DIFF_UPDATE_QUERIES = UPDATE_QUERIES + 5
+
+
+@pytest.fixture
+def many_ingredients():
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(60)
+    )
+
+
+@pytest.fixture
+def author_client(authors):
+    client = APIClient()
+    client.force_authenticate(authors[0])
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (3, 30))
+def test_update_query_count(author_client, authors, tags, many_ingredients,
+                            count, django_assert_num_queries):
+    """Число запросов не зависит от числа замененных ингредиентов"""
+    ingredients = list(Ingredient.objects.order_by('pk'))
+    recipe = create_recipe(authors[0], tags, ingredients[:count], 0)
+    updated_at = recipe.updated_at
+    new_ingredients = ingredients[count:2 * count]
+    with django_assert_num_queries(UPDATE_QUERIES):
+        response = author_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 5}
+                    for ingredient in new_ingredients
+                ],
+            },
+            format='json',
+        )
+    assert response.status_code == 200
+    assert [
+        ingredient['id'] for ingredient in response.json()['ingredients']
+    ] == [ingredient.pk for ingredient in new_ingredients]
+    recipe.refresh_from_db()
+    assert recipe.updated_at > updated_at
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (3, 30))
+def test_delete_query_count(author_client, authors, tags, many_ingredients,
+                            count, django_assert_num_queries):
+    """Число запросов не зависит от числа ингредиентов рецепта"""
+    ingredients = list(Ingredient.objects.order_by('pk'))
+    recipe = create_recipe(authors[0], tags, ingredients[:count], 0)
+    with django_assert_num_queries(DELETE_QUERIES):
+        response = author_client.delete(f'/api/recipes/{recipe.pk}/')
+    assert response.status_code == 204
+    assert not Recipe.objects.filter(pk=recipe.pk).exists()
+    assert not CountOfIngredient.objects.filter(recipe=recipe.pk).exists()
+
+
+@pytest.mark.django_db
+def test_update_keeps_maintained_fields(rf, user, authors, tags,
+                                        ingredients):
+    """
+    Изменение рецепта не записывает счетчики и результат обработки
+    изображения, прочитанные до их изменения
+    """
+    recipe = create_recipe(authors[0], tags, ingredients, 0)
+    stale = Recipe.objects.get(pk=recipe.pk)
+    Favorite.objects.create(user=user, recipe=recipe)
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    Recipe.objects.filter(pk=recipe.pk).update(
+        image_status=Recipe.IMAGE_READY, thumbnail='recipes/t.webp',
+    )
+    request = rf.patch('/')
+    request.user = authors[0]
+    serializer = RecipeWriteSerializer(
+        stale, data={'name': 'Новое название'}, partial=True,
+        context={'request': request},
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    recipe.refresh_from_db()
+    assert recipe.name == 'Новое название'
+    assert (recipe.favorites_count, recipe.carts_count) == (1, 1)
+    assert recipe.thumbnail == 'recipes/t.webp'
+
+
+@pytest.mark.django_db
+def test_user_save_keeps_counters(user, authors):
+    """Полное сохранение пользователя не записывает его счетчики"""
+    stale = type(authors[0]).objects.get(pk=authors[0].pk)
+    Follow.objects.create(user=user, author=authors[0])
+    create_recipe(authors[0], [], [], 0)
+    stale.first_name = 'Новое имя'
+    stale.save()
+    authors[0].refresh_from_db()
+    assert authors[0].first_name == 'Новое имя'
+    assert (authors[0].followers_count, authors[0].recipes_count) == (1, 1)
+
+
+def relation_rows(recipe):
+    amounts = {
+        ingredient_id: (pk, amount)
+        for pk, ingredient_id, amount in CountOfIngredient.objects.filter(
+            recipe=recipe
+        ).values_list('pk', 'ingredient_id', 'amount')
+    }
+    tags = dict(Recipe.tags.through.objects.filter(
+        recipe=recipe
+    ).values_list('tag_id', 'pk'))
+    return amounts, tags
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (3, 15))
+def test_update_diff(author_client, authors, tags, many_ingredients, count,
+                     django_assert_num_queries):
+    """
+    Неизменные строки остаются, измененные количества обновляются,
+    удаленные строки удаляются, новые добавляются; число запросов
+    не зависит от числа строк
+    """
+    ingredients = list(Ingredient.objects.order_by('pk'))
+    kept, changed, removed, added = (
+        ingredients[part * count:(part + 1) * count] for part in range(4)
+    )
+    recipe = create_recipe(authors[0], tags[:2], kept + changed + removed, 0)
+    amounts, tag_rows = relation_rows(recipe)
+    payload = [
+        {'id': ingredient.pk, 'amount': amounts[ingredient.pk][1]}
+        for ingredient in kept
+    ] + [
+        {'id': ingredient.pk, 'amount': amounts[ingredient.pk][1] + 100}
+        for ingredient in changed
+    ] + [{'id': ingredient.pk, 'amount': 7} for ingredient in added]
+    with django_assert_num_queries(DIFF_UPDATE_QUERIES):
+        response = author_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {'ingredients': payload, 'tags': [tags[1].pk, tags[2].pk]},
+            format='json',
+        )
+    assert response.status_code == 200
+    new_amounts, new_tag_rows = relation_rows(recipe)
+    for ingredient in kept:
+        assert new_amounts[ingredient.pk] == amounts[ingredient.pk]
+    for ingredient in changed:
+        pk, amount = amounts[ingredient.pk]
+        assert new_amounts[ingredient.pk] == (pk, amount + 100)
+    for ingredient in removed:
+        assert ingredient.pk not in new_amounts
+    for ingredient in added:
+        assert new_amounts[ingredient.pk][1] == 7
+    assert new_tag_rows.keys() == {tags[1].pk, tags[2].pk}
+    assert new_tag_rows[tags[1].pk] == tag_rows[tags[1].pk]
@@ -0,0 +1,53 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+DATA = (
+    {'amount': Decimal('12.50'), 'small': Decimal('0.000001')},
+    {'large': 1e16, 'small': 1.5e-7, 'text': '1e5 "1e-6" \\1e7'},
+    {'integer': 2 ** 70},
+    {
+        'aware': datetime.datetime(
+            2026, 10, 17, 7, 15, 30, 123456, tzinfo=datetime.timezone.utc
+        ),
+        'naive': datetime.datetime(2026, 10, 17, 7, 15, 30, 999999),
+        'offset': datetime.datetime(
+            2026, 10, 17, 7, 15, tzinfo=timezone.get_fixed_timezone(180)
+        ),
+        'date': datetime.date(2026, 10, 17),
+        'time': datetime.time(7, 15, 30, 500),
+        'duration': datetime.timedelta(hours=1, seconds=5),
+    },
+    {'lazy': gettext_lazy('Рецепт'), 'nested': [gettext_lazy('Тег')]},
+    {'text': 'строка\u2028перевод\u2029абзац', 'emoji': '🍲'},
+    {1: 'число в ключе', 'uuid': uuid.UUID(int=1), 'none': None},
+    [{'id': 1, 'flags': [True, False], 'ratio': 0.5}],
+)
+
+
+@pytest.mark.parametrize('data', DATA)
+def test_same_as_json_renderer(data):
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+@pytest.mark.parametrize('media_type', (
+    'application/json', 'application/json; indent=4',
+))
+def test_same_as_json_renderer_for_media_type(media_type):
+    data = DATA[1]
+    assert FastJSONRenderer().render(data, media_type) == (
+        JSONRenderer().render(data, media_type)
+    )
+
+
+def test_line_separators_are_escaped():
+    """U+2028 и U+2029 экранируются, как в JSONRenderer"""
+    content = FastJSONRenderer().render({'text': '\u2028\u2029'})
+    assert content == b'{"text":"\\u2028\\u2029"}'
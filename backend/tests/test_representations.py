@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from django.conf import settings as django_settings
+
+from api.models import Recipe
+from api.representations import build_recipe_fragments
+from api.serializers import serialize_fragments
+
+SCHEMA = os.path.join(
+    os.path.dirname(django_settings.BASE_DIR), 'docs', 'openapi-schema.yml'
+)
+
+
+@pytest.fixture
+def varied_recipes(recipes, make_recipe, authors, tags, ingredients):
+    """
+    Рецепты с несколькими тегами и ингредиентами, без изображения,
+    без автора и автора, на которого подписан пользователь
+    """
+    without_image = make_recipe(authors[0], tags, ingredients, 100, image='')
+    without_author = make_recipe(authors[1], tags[:2], ingredients[:2], 101)
+    authors[1].recipes.filter(pk=without_author.pk).update(author=None)
+    return list(Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes[-6:]]
+        + [without_image.pk, without_author.pk]
+    ).order_by('pk'))
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rendition', (None, 'thumbnail'))
+def test_fast_fragments_match_serializer(varied_recipes, rendition):
+    assert build_recipe_fragments(varied_recipes, rendition) == (
+        serialize_fragments(varied_recipes, rendition)
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/api/recipes/?limit=100', '/api/recipes/{pk}/',
+))
+def test_fast_representation_matches_serializer(settings, client,
+                                                varied_recipes, url):
+    """Ответы API с построением фрагментов без DRF и через DRF совпадают"""
+    url = url.format(pk=varied_recipes[0].pk)
+    settings.RECIPE_FAST_REPRESENTATION = True
+    fast = client.get(url).content
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foodgram-tests-serializer',
+        }
+    }
+    settings.RECIPE_FAST_REPRESENTATION = False
+    assert client.get(url).content == fast
+
+
+@pytest.mark.django_db
+def test_representation_matches_schema(client, varied_recipes):
+    """Поля рецепта совпадают со схемой RecipeList"""
+    yaml = pytest.importorskip('yaml')
+    with open(SCHEMA, encoding='utf-8') as schema:
+        recipe_list = yaml.safe_load(schema)['components']['schemas'][
+            'RecipeList'
+        ]
+    data = client.get(f'/api/recipes/{varied_recipes[0].pk}/').json()
+    assert set(data) == set(recipe_list['properties'])
+    assert data['image_status'] in (
+        recipe_list['properties']['image_status']['enum']
+    )
@@ -0,0 +1,69 @@
+import pytest
+from rest_framework.test import APIClient
+
+from api.models import ShoppingCart, ShoppingCartIngredient
+from api.shopping_cart import (
+    expected_shopping_cart_totals,
+    shopping_cart_rows,
+    stored_shopping_cart_totals
+)
+
+
+def assert_totals_match(user):
+    """Суммы в ShoppingCartIngredient совпадают с пересчетом по рецептам"""
+    assert stored_shopping_cart_totals([user.pk]) == (
+        expected_shopping_cart_totals([user.pk])
+    )
+
+
+@pytest.mark.django_db
+def test_add_and_remove(client, user, recipes):
+    assert_totals_match(user)
+    recipe = recipes[1]
+    response = client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    assert response.status_code == 201
+    assert_totals_match(user)
+    for recipe in (recipes[0], recipes[1], recipes[3]):
+        response = client.delete(f'/api/recipes/{recipe.pk}/shopping_cart/')
+        assert response.status_code == 204
+        assert_totals_match(user)
+
+
+@pytest.mark.django_db
+def test_remove_all_clears_rows(client, user, recipes):
+    for cart in ShoppingCart.objects.filter(user=user):
+        client.delete(f'/api/recipes/{cart.recipe_id}/shopping_cart/')
+    assert list(shopping_cart_rows(user)) == []
+    assert not ShoppingCartIngredient.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_recipe_ingredients_change(client, user, recipes, ingredients):
+    """Изменение ингредиентов рецепта переносится в списки покупок"""
+    recipe = recipes[3]
+    author_client = APIClient()
+    author_client.force_authenticate(recipe.author)
+    response = author_client.patch(
+        f'/api/recipes/{recipe.pk}/',
+        {
+            'ingredients': [
+                {'id': ingredients[0].pk, 'amount': 7},
+                {'id': ingredients[3].pk, 'amount': 2},
+            ],
+        },
+        format='json',
+    )
+    assert response.status_code == 200
+    assert_totals_match(user)
+
+
+@pytest.mark.django_db
+def test_drifted_total_is_not_negative(client, user, recipes):
+    """Сумма меньше количества в рецепте не мешает удалить рецепт"""
+    recipe = recipes[3]
+    ShoppingCartIngredient.objects.filter(user=user).update(total_amount=1)
+    response = client.delete(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    assert response.status_code == 204
+    assert all(
+        row['amount'] > 0 for row in shopping_cart_rows(user)
+    )
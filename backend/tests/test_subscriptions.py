@@ -0,0 +1,58 @@
+import pytest
+
+from tests.conftest import create_recipe
+from users.models import Follow
+
+# Подписки: COUNT авторов, авторы страницы, рецепты всех авторов страницы
+SUBSCRIPTIONS_QUERIES = 3
+
+
+@pytest.fixture
+def followed_authors(django_user_model, user):
+    def follow(count):
+        authors = []
+        for number in range(count):
+            author = django_user_model.objects.create_user(
+                username=f'followed{number}',
+                email=f'followed{number}@foodgram.ru',
+                password='Pass12345!',
+            )
+            for recipe_number in range(5):
+                create_recipe(author, [], [], recipe_number)
+            Follow.objects.create(user=user, author=author)
+            authors.append(author)
+        return authors
+
+    return follow
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (1, 8))
+def test_subscriptions_query_count(client, followed_authors, count,
+                                   django_assert_num_queries):
+    """Число запросов не зависит от числа подписок"""
+    followed_authors(count)
+    with django_assert_num_queries(SUBSCRIPTIONS_QUERIES):
+        response = client.get(
+            '/api/users/subscriptions/?recipes_limit=2&limit=10'
+        )
+    assert len(response.json()['results']) == count
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit, expected', (('2', 2), ('10', 5), ('', 5)))
+def test_recipes_limit(client, followed_authors, limit, expected):
+    """Последние recipes_limit рецептов каждого автора"""
+    authors = followed_authors(3)
+    response = client.get(
+        f'/api/users/subscriptions/?recipes_limit={limit}'
+    )
+    results = response.json()['results']
+    assert [author['id'] for author in results] == [
+        author.pk for author in authors
+    ]
+    for author in results:
+        ids = [recipe['id'] for recipe in author['recipes']]
+        assert len(ids) == expected
+        assert ids == sorted(ids, reverse=True)
+        assert author['recipes_count'] == 5
@@ -19,7 +19,28 @@ class CustomUserManager(UserManager):
         )
 
 
-class User(AbstractUser):
+class MaintainedFieldsMixin:
+    """
+    Сохранение существующего объекта без update_fields не записывает
+    поля MAINTAINED_FIELDS: они изменяются в базе данных выражениями F()
+    и запросами update(), а в объекте могут быть устаревшими
+    """
+    MAINTAINED_FIELDS = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not force_insert and (
+            not self._state.adding
+        ):
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
+
+class User(MaintainedFieldsMixin, AbstractUser):
     """
     Модель для хранения пользователей
     Ключевые аргументы:
@@ -50,6 +71,14 @@ class User(AbstractUser):
     )
     is_superuser = models.BooleanField('Администратор', default=False)
     is_blocked = models.BooleanField('Заблокирован', default=False)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False
+    )
+
+    MAINTAINED_FIELDS = ('recipes_count', 'followers_count')
 
     objects = CustomUserManager()
 
@@ -2,6 +2,7 @@ from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
+from api.fields import RecipeImageField
 from api.models import Recipe
 from users.models import Follow, User
 
@@ -42,6 +43,8 @@ class UserDetailSerializer(UserSerializer):
         'is_subscribed' = True, если авторизированный пользователь
         подписан на текущего
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
@@ -55,6 +58,8 @@ class RecipeFollowSerializer(serializers.ModelSerializer):
     Сериализатор для обработки данных о рецепете
     применяется в FollowListSerializer
     """
+    image = RecipeImageField(rendition='small_thumbnail')
+
     class Meta:
         model = Recipe
         fields = (
@@ -67,7 +72,7 @@ class FollowSerializer(UserDetailSerializer):
     Сериализатор подписок на авторов
     """
     recipes = RecipeFollowSerializer(many=True)
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -87,15 +92,14 @@ class FollowSerializer(UserDetailSerializer):
             return False
         return Follow.objects.filter(user=request.user, author=obj).exists()
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class RecipeFollowSerializer(serializers.ModelSerializer):
     """
     Сериализатор для обработки данных о рецепете
     применяется в FollowListSerializer
     """
+    image = RecipeImageField(rendition='small_thumbnail')
+
     class Meta:
         model = Recipe
         fields = (
@@ -111,7 +115,7 @@ class FollowListSerializer(serializers.ModelSerializer):
     """
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField(read_only=True)
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -119,22 +123,18 @@ class FollowListSerializer(serializers.ModelSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_is_subscribed(self, obj):
-        request = self.context.get('request')
-        if not request or request.user.is_anonymous:
-            return False
-        return Follow.objects.filter(user=request.user, author=obj).exists()
+        """
+        В списке подписок все авторы - те, на кого подписан пользователь
+        """
+        return True
 
     def get_recipes(self, data):
-        recipes_limit = self.context.get('request').GET.get('recipes_limit')
-        recipes = (
-            data.recipes.all()[:int(recipes_limit)]
-            if recipes_limit else data.recipes
-        )
+        """
+        Рецепты автора, ограничение 'recipes_limit' применяется
+        при загрузке рецептов в UserSubscribeViewSet.subscriptions
+        """
         serializer = serializers.ListSerializer(child=RecipeFollowSerializer())
-        return serializer.to_representation(recipes)
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return serializer.to_representation(data.recipes.all())
 
 
 class FollowPostSerializer(UserDetailSerializer):
@@ -1,3 +1,4 @@
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.views import TokenCreateView, UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action, permission_classes
@@ -5,6 +6,7 @@ from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.models import Recipe
 from foodgram.pagination import LimitPageNumberPagination
 from users.models import Follow, User
 from users.serializers import (
@@ -79,10 +81,26 @@ class UserSubscribeViewSet(UserViewSet):
     @permission_classes([IsAuthenticated])
     def subscriptions(self, request):
         user = request.user
-        followed_list = User.objects.filter(following__user=user)
+        followed_list = User.objects.filter(
+            following__user=user
+        ).order_by('id')
         page = self.paginate_queryset(followed_list)
+        authors = list(followed_list) if page is None else page
+        self.prefetch_recipes(authors, request.query_params.get(
+            'recipes_limit'
+        ))
+        serializer = self.get_subscribtion_serializer(authors, many=True)
         if page is not None:
-            serializer = self.get_subscribtion_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
-        serializer = self.get_subscribtion_serializer(followed_list, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def prefetch_recipes(self, authors, recipes_limit):
+        """
+        Загружает рецепты всех авторов страницы одним запросом
+        """
+        recipes = Recipe.objects.filter(author__in=authors)
+        if recipes_limit is not None and recipes_limit.isdigit():
+            recipes = recipes.limit_per_author(int(recipes_limit))
+        prefetch_related_objects(
+            authors, Prefetch('recipes', queryset=recipes)
+        )